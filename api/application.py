@@ -1,38 +1,72 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-import logging
+
 from fastapi import FastAPI
 
-from alembic import command
-from fastapi.staticfiles import StaticFiles
-from pathlib import Path
-from apps.router import router
+from apps.router import root_router, router
 from core.settings import get_settings
-from alembic.config import Config
-from utils.db import init_db
+from utils.admission import AdmissionControlMiddleware
+from utils.data_changes import DataChangeListener
+from utils.db import engine, read_session, replica_router, warm_pool
+from utils.metrics import MetricsMiddleware
+from utils.query_stats import QueryStatsMiddleware
+from utils.readiness import readiness
+from apps.activity.hierarchy import activity_hierarchy_cache
+from apps.building import geo
+from apps.building.geo import building_geo_index_cache
+from apps.organization.cache import organization_response_cache
+from utils.logger import get_logger
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
+WARMUP_RETRY_MAX_DELAY = 10
+
+
+def invalidate_caches():
+    """Сбрасывает кэши процесса после изменения данных вне его ORM"""
+    organization_response_cache.invalidate()
+    activity_hierarchy_cache.invalidate()
+    building_geo_index_cache.invalidate()
 
-def create_app():
-    settings = get_settings()
 
-    def apply_migrations():
-        logger.info("Starting Alembic migrations...")
+async def warm_up(settings):
+    """
+    Прогревает пул соединений и кэши, после чего процесс становится готовым.
+    Пока БД недоступна, попытки повторяются с растущей паузой
+    """
+    checks = ["db_pool", "activity_hierarchy"]
+    if settings.GEO_SEARCH_ENGINE == "numpy":
+        checks.append("building_geo_index")
+    readiness.start(checks)
+
+    attempt = 0
+    while True:
         try:
-            alembic_cfg = Config("alembic.ini")
-            command.upgrade(alembic_cfg, "head")
-            logger.info("Alembic migrations applied successfully")
+            await warm_pool()
+            # Недоступная реплика не держит готовность: её чтения уйдут на primary
+            await replica_router.check_health()
+            for replica in replica_router.replicas:
+                if replica.healthy:
+                    await warm_pool(replica.engine)
+            readiness.mark_done("db_pool")
+            async with read_session() as session:
+                await activity_hierarchy_cache.load(session)
+                readiness.mark_done("activity_hierarchy")
+                if settings.GEO_SEARCH_ENGINE == "numpy":
+                    await building_geo_index_cache.load(session)
+                    readiness.mark_done("building_geo_index")
+                if session.bind.dialect.name == "postgresql":
+                    await geo.get_distance_backend(session)
+            logger.info("Warm-up finished: %s", readiness.as_dict()["done"])
+            return
         except Exception as e:
-            logger.error(f"Failed to apply migrations: {str(e)}")
-            raise
+            delay = min(0.5 * 2**attempt, WARMUP_RETRY_MAX_DELAY)
+            attempt += 1
+            logger.warning(f"Warm-up failed, retrying in {delay}s: {str(e)}")
+            await asyncio.sleep(delay)
 
-    async def run_migrations_in_thread():
-        logger.info("Running migrations in thread...")
-        loop = asyncio.get_running_loop()
-        with ThreadPoolExecutor() as pool:
-            await loop.run_in_executor(pool, apply_migrations)
+
+def create_app():
+    settings = get_settings()
 
     app = FastAPI(
         redoc_url="/redoc/",
@@ -41,12 +75,39 @@ def create_app():
     )
 
     app.include_router(prefix="/v1", router=router)
+    app.include_router(root_router)
+    app.add_middleware(QueryStatsMiddleware)
+    # Внутри MetricsMiddleware, чтобы отказы 503 попадали в метрики маршрутов
+    app.add_middleware(AdmissionControlMiddleware)
+    app.add_middleware(MetricsMiddleware)
 
     @app.on_event("startup")
     async def startup_event():
-        logger.info("Initializing database...")
-        await init_db()
-        logger.info("Applying migrations...")
-        await run_migrations_in_thread()
+        # Схема готовится до запуска сервера (serve.py), здесь только прогрев.
+        # Порт открывается сразу, трафик идёт после того, как /ready ответит 200
+        logger.info("Starting warm-up in background...")
+        app.state.warm_up_task = asyncio.create_task(warm_up(settings))
+        app.state.health_check_task = None
+        if replica_router.replicas:
+            app.state.health_check_task = asyncio.create_task(
+                replica_router.run_health_checks()
+            )
+        app.state.data_change_task = None
+        if engine.dialect.name == "postgresql":
+            app.state.data_change_task = asyncio.create_task(
+                DataChangeListener(invalidate_caches).run()
+            )
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        readiness.shutdown()
+        app.state.warm_up_task.cancel()
+        if app.state.health_check_task is not None:
+            app.state.health_check_task.cancel()
+        if app.state.data_change_task is not None:
+            app.state.data_change_task.cancel()
+        logger.info("Disposing database engines...")
+        await engine.dispose()
+        await replica_router.dispose()
 
     return app
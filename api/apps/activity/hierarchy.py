@@ -0,0 +1,148 @@
+from array import array
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.activity.models import Activity
+from core.settings import get_settings
+from utils.cache import SnapshotCache
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+NO_PARENT = -1
+
+
+class ActivityHierarchy:
+    """
+    Неизменяемый снимок всего леса видов деятельности.
+    Хранит компактные массивы индекс -> родитель/дети/имя, поэтому
+    подъём к корню занимает O(глубины), а поддеревья собираются без БД
+    """
+
+    __slots__ = ("_index", "_ids", "_names", "_parents", "_children", "_subtrees")
+
+    def __init__(self, rows: Iterable[Tuple[int, str, int | None]]):
+        rows = sorted(rows, key=lambda row: row[0])
+        self._ids = array("l", (row[0] for row in rows))
+        self._index: Dict[int, int] = {
+            activity_id: i for i, activity_id in enumerate(self._ids)
+        }
+        self._names: List[str] = [row[1] for row in rows]
+        self._parents = array(
+            "l",
+            (
+                self._index.get(row[2], NO_PARENT) if row[2] is not None else NO_PARENT
+                for row in rows
+            ),
+        )
+        children: List[List[int]] = [[] for _ in rows]
+        for i, parent in enumerate(self._parents):
+            if parent != NO_PARENT:
+                children[parent].append(i)
+        self._children: List[Tuple[int, ...]] = [tuple(c) for c in children]
+        self._subtrees: Dict[int, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, activity_id: int) -> bool:
+        return activity_id in self._index
+
+    def name(self, activity_id: int) -> str:
+        return self._names[self._index[activity_id]]
+
+    def parent_id(self, activity_id: int) -> int | None:
+        parent = self._parents[self._index[activity_id]]
+        return None if parent == NO_PARENT else self._ids[parent]
+
+    def ancestors(self, activity_id: int) -> List[int]:
+        """Возвращает id активности и всех её предков, от самой активности к корню"""
+        path = []
+        i = self._index[activity_id]
+        while i != NO_PARENT:
+            path.append(self._ids[i])
+            i = self._parents[i]
+        return path
+
+    def descendants(self, activity_id: int) -> List[int]:
+        """Возвращает id активности и всех её потомков"""
+        result = []
+        stack = [self._index[activity_id]]
+        while stack:
+            i = stack.pop()
+            result.append(self._ids[i])
+            stack.extend(self._children[i])
+        return result
+
+    def subtree(self, activity_id: int) -> dict:
+        """Готовое поддерево активности, строится один раз на снимок"""
+        subtree = self._subtrees.get(activity_id)
+        if subtree is None:
+            i = self._index[activity_id]
+            subtree = {
+                "id": activity_id,
+                "name": self._names[i],
+                "children": [
+                    self.subtree(self._ids[child]) for child in self._children[i]
+                ],
+            }
+            self._subtrees[activity_id] = subtree
+        return subtree
+
+    def build_trees(self, activity_ids: Iterable[int]) -> List[dict]:
+        """
+        Строит дерево для набора привязанных активностей:
+        сами активности, их предки и связи между ними
+        """
+        indexes: Set[int] = set()
+        for activity_id in activity_ids:
+            i = self._index.get(activity_id, NO_PARENT)
+            while i != NO_PARENT and i not in indexes:
+                indexes.add(i)
+                i = self._parents[i]
+
+        def _build_tree(i: int) -> dict:
+            return {
+                "id": self._ids[i],
+                "name": self._names[i],
+                "children": [
+                    _build_tree(child)
+                    for child in self._children[i]
+                    if child in indexes
+                ],
+            }
+
+        return [
+            _build_tree(i) for i in sorted(indexes) if self._parents[i] == NO_PARENT
+        ]
+
+
+class ActivityHierarchyCache(SnapshotCache[ActivityHierarchy]):
+    """Кэш иерархии видов деятельности внутри процесса"""
+
+    name = "activity_hierarchy"
+
+    async def _load(self, db: AsyncSession) -> ActivityHierarchy:
+        """Загружает весь лес активностей одним запросом"""
+        result = await db.execute(
+            select(Activity.id, Activity.name, Activity.parent_id)
+        )
+        hierarchy = ActivityHierarchy(result.tuples().all())
+        logger.info("Activity hierarchy loaded: %d activities", len(hierarchy))
+        return hierarchy
+
+    async def get(
+        self, db: AsyncSession, required_ids: Iterable[int] = ()
+    ) -> ActivityHierarchy:
+        """
+        Возвращает актуальный снимок иерархии.
+        Если среди required_ids есть неизвестные снимку активности, он перечитывается
+        """
+        hierarchy = self._snapshot
+        force = hierarchy is not None and not all(i in hierarchy for i in required_ids)
+        return await super().get(db, force=force)
+
+
+activity_hierarchy_cache = ActivityHierarchyCache(ttl=get_settings().ACTIVITY_CACHE_TTL)
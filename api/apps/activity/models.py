@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Float, Integer, String, ForeignKey
+from sqlalchemy import Column, Float, Index, Integer, String, ForeignKey, Table
 from utils.db import Base
 from sqlalchemy.orm import relationship
 from utils.logger import get_logger
@@ -10,6 +10,14 @@ class Activity(Base):
     """Модель вида деятельности с древовидной структурой"""
 
     __tablename__ = "activities"
+    __table_args__ = (
+        Index(
+            "ix_activities_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -23,3 +31,24 @@ class Activity(Base):
 
     def __repr__(self):
         return f"<Activity(id={self.id}, name='{self.name}')>"
+
+
+# Таблица замыкания: каждая пара предок-потомок, включая саму активность с depth=0
+activity_closure = Table(
+    "activity_closure",
+    Base.metadata,
+    Column(
+        "ancestor_id",
+        Integer,
+        ForeignKey("activities.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column(
+        "descendant_id",
+        Integer,
+        ForeignKey("activities.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("depth", Integer, nullable=False),
+    Index("ix_activity_closure_descendant_id", "descendant_id", "ancestor_id"),
+)
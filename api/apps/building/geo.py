@@ -0,0 +1,162 @@
+import math
+from typing import TYPE_CHECKING, Tuple
+
+from sqlalchemy import Boolean, Float, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.building.models import Building
+from core.settings import get_settings
+from utils.cache import SnapshotCache
+from utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from apps.building.geo_engine import BuildingGeoIndex
+
+logger = get_logger(__name__)
+
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+# Дальше половины окружности точек на сфере нет
+MAX_EARTH_DISTANCE = math.pi * EARTH_RADIUS_METERS
+# Во сколько раз расширяется область поиска ближайших, если в ней не нашлось limit организаций
+KNN_SEARCH_GROWTH = 4
+
+POSTGIS = "postgis"
+EARTHDISTANCE = "earthdistance"
+PLAIN = "plain"
+
+_extensions: frozenset | None = None
+_distance_backend: str | None = None
+
+
+def bounding_box(
+    latitude: float, longitude: float, radius: float
+) -> Tuple[float, float, float, float]:
+    """
+    Возвращает (min_lat, max_lat, min_lon, max_lon) квадрата, в который гарантированно
+    попадает круг радиуса radius метров. Около полюсов и через 180-й меридиан
+    ограничение по долготе снимается
+    """
+    lat_delta = radius / METERS_PER_DEGREE
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    lon_delta = lat_delta / math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    min_lon, max_lon = longitude - lon_delta, longitude + lon_delta
+    if min_lon < -180 or max_lon > 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def within_bounding_box(
+    latitude: float, longitude: float, radius: float, source=Building
+):
+    """
+    Условие по индексу (latitude, longitude).
+    source - модель с колонками latitude и longitude, по умолчанию здания
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius)
+    return (
+        source.latitude.between(min_lat, max_lat),
+        source.longitude.between(min_lon, max_lon),
+    )
+
+
+def distance_expression(
+    latitude: float, longitude: float, backend: str = PLAIN, source=Building
+):
+    """SQL-выражение расстояния в метрах от точки до координат source"""
+    if backend == POSTGIS:
+        return func.ST_DistanceSphere(
+            func.ST_MakePoint(source.longitude, source.latitude),
+            func.ST_MakePoint(longitude, latitude),
+        )
+    if backend == EARTHDISTANCE:
+        return func.earth_distance(
+            func.ll_to_earth(source.latitude, source.longitude),
+            func.ll_to_earth(latitude, longitude),
+        )
+    # Формула гаверсинусов на чистом SQL
+    half_dlat = func.radians(source.latitude - latitude) / 2
+    half_dlon = func.radians(source.longitude - longitude) / 2
+    a = func.power(func.sin(half_dlat), 2) + func.cos(
+        func.radians(latitude)
+    ) * func.cos(func.radians(source.latitude)) * func.power(func.sin(half_dlon), 2)
+    return 2 * EARTH_RADIUS_METERS * func.asin(func.least(1.0, func.sqrt(a)))
+
+
+def knn_order_expression(latitude: float, longitude: float, source=Building):
+    """
+    Расстояние между точками в пространстве cube (хорда, растёт вместе с расстоянием по сфере).
+    Сортировка по нему обслуживается GiST-индексом по ll_to_earth(latitude, longitude)
+    """
+    return func.ll_to_earth(source.latitude, source.longitude).op(
+        "<->", return_type=Float
+    )(func.ll_to_earth(latitude, longitude))
+
+
+def within_earth_box(latitude: float, longitude: float, radius: float, source=Building):
+    """Условие по GiST-индексу ll_to_earth: куб, описанный вокруг круга радиуса radius"""
+    return func.earth_box(func.ll_to_earth(latitude, longitude), radius).op(
+        "@>", return_type=Boolean
+    )(func.ll_to_earth(source.latitude, source.longitude))
+
+
+async def get_extensions(db: AsyncSession) -> frozenset:
+    """Один раз на процесс читает, какие гео-расширения установлены в PG"""
+    global _extensions
+    if _extensions is None:
+        result = await db.execute(
+            text(
+                "SELECT extname FROM pg_extension "
+                "WHERE extname IN ('postgis', 'earthdistance')"
+            )
+        )
+        _extensions = frozenset(result.scalars().all())
+    return _extensions
+
+
+async def has_knn_index(db: AsyncSession) -> bool:
+    """Индекс ближайших строится миграцией только при установленном earthdistance"""
+    return EARTHDISTANCE in await get_extensions(db)
+
+
+async def get_distance_backend(db: AsyncSession) -> str:
+    """Определяет один раз на процесс, какими расширениями PG можно считать расстояние"""
+    global _distance_backend
+    if _distance_backend is None:
+        extensions = await get_extensions(db)
+        if POSTGIS in extensions:
+            _distance_backend = POSTGIS
+        elif EARTHDISTANCE in extensions:
+            _distance_backend = EARTHDISTANCE
+        else:
+            _distance_backend = PLAIN
+        logger.info("Geo distance backend: %s", _distance_backend)
+    return _distance_backend
+
+
+class BuildingGeoIndexCache(SnapshotCache["BuildingGeoIndex"]):
+    """Кэш координат всех зданий для векторного гео-поиска в памяти"""
+
+    name = "building_geo_index"
+
+    async def _load(self, db: AsyncSession) -> "BuildingGeoIndex":
+        from apps.building.geo_engine import BuildingGeoIndex
+
+        result = await db.execute(
+            select(Building.id, Building.latitude, Building.longitude)
+        )
+        rows = result.tuples().all()
+        index = BuildingGeoIndex(
+            [row[0] for row in rows],
+            [row[1] for row in rows],
+            [row[2] for row in rows],
+        )
+        logger.info("Building geo index loaded: %d buildings", len(index))
+        return index
+
+
+building_geo_index_cache = BuildingGeoIndexCache(
+    ttl=get_settings().BUILDING_GEO_INDEX_TTL
+)
@@ -0,0 +1,119 @@
+"""
+Векторный движок гео-поиска по зданиям.
+Используется, когда фильтрацию по расстоянию нельзя отдать Postgres.
+Модуль не зависит от БД и настроек, чтобы его можно было гонять в бенчмарках
+"""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371008.8
+# Сфера против эллипсоида WGS84 ошибается не больше чем на ~0.56%,
+# точное расстояние пересчитывается только внутри этой полосы у границы радиуса
+REFINE_TOLERANCE = 0.006
+
+
+class BuildingGeoIndex:
+    """Координаты зданий в массивах NumPy (в радианах) для поиска за один проход"""
+
+    __slots__ = ("ids", "latitudes", "longitudes", "_lat", "_lon", "_cos_lat")
+
+    def __init__(
+        self,
+        ids: Iterable[int],
+        latitudes: Iterable[float],
+        longitudes: Iterable[float],
+    ):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self._lat = np.radians(self.latitudes)
+        self._lon = np.radians(self.longitudes)
+        self._cos_lat = np.cos(self._lat)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def distances(self, latitude: float, longitude: float) -> np.ndarray:
+        """Расстояния по формуле гаверсинусов в метрах от точки до всех зданий"""
+        lat = np.radians(latitude)
+        lon = np.radians(longitude)
+        a = (
+            np.sin((self._lat - lat) / 2) ** 2
+            + np.cos(lat) * self._cos_lat * np.sin((self._lon - lon) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def _refine(
+        self,
+        latitude: float,
+        longitude: float,
+        positions: np.ndarray,
+        distances: np.ndarray,
+        boundary: float,
+    ) -> np.ndarray:
+        """Пересчитывает по эллипсоиду расстояния, близкие к границе boundary"""
+        from geopy.distance import geodesic
+
+        near = np.abs(distances - boundary) <= boundary * REFINE_TOLERANCE
+        distances = distances.copy()
+        for i in np.flatnonzero(near):
+            position = positions[i]
+            distances[i] = geodesic(
+                (latitude, longitude),
+                (self.latitudes[position], self.longitudes[position]),
+            ).meters
+        return distances
+
+    def within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float,
+        refine: bool = True,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Возвращает (id зданий, расстояния) в радиусе radius метров,
+        отсортированные по расстоянию
+        """
+        distances = self.distances(latitude, longitude)
+        limit = radius * (1 + REFINE_TOLERANCE) if refine else radius
+        positions = np.flatnonzero(distances <= limit)
+        found = distances[positions]
+        if refine:
+            found = self._refine(latitude, longitude, positions, found, radius)
+            inside = found <= radius
+            positions, found = positions[inside], found[inside]
+        order = np.lexsort((self.ids[positions], found))
+        return self.ids[positions][order], found[order]
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int,
+        max_distance: float | None = None,
+        refine: bool = True,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Возвращает (id зданий, расстояния) для limit ближайших зданий"""
+        distances = self.distances(latitude, longitude)
+        positions = np.arange(len(distances))
+        if max_distance is not None:
+            bound = max_distance * (1 + REFINE_TOLERANCE) if refine else max_distance
+            positions = np.flatnonzero(distances <= bound)
+        # Небольшой запас, чтобы уточнение по эллипсоиду не поменяло состав выборки
+        take = min(len(positions), limit + max(1, limit // 10))
+        if take < len(positions):
+            positions = positions[
+                np.argpartition(distances[positions], take - 1)[:take]
+            ]
+        found = distances[positions]
+        if refine and len(found):
+            boundary = max_distance if max_distance is not None else found.max()
+            found = self._refine(latitude, longitude, positions, found, boundary)
+            if max_distance is not None:
+                inside = found <= max_distance
+                positions, found = positions[inside], found[inside]
+        order = np.lexsort((self.ids[positions], found))[:limit]
+        return self.ids[positions][order], found[order]
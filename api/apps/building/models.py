@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ARRAY, Float
+from sqlalchemy import Column, Index, Integer, String, ARRAY, Float, text
 from utils.db import Base
 from sqlalchemy.orm import relationship
 from utils.logger import get_logger
@@ -10,6 +10,21 @@ class Building(Base):
     """Модель здания"""
 
     __tablename__ = "buildings"
+    __table_args__ = (
+        Index("ix_buildings_latitude_longitude", "latitude", "longitude"),
+        Index(
+            "ix_buildings_address_trgm",
+            "address",
+            postgresql_using="gin",
+            postgresql_ops={"address": "gin_trgm_ops"},
+        ),
+        # Поиск ближайших зданий оператором <-> (расширение earthdistance)
+        Index(
+            "ix_buildings_ll_to_earth",
+            text("ll_to_earth(latitude, longitude)"),
+            postgresql_using="gist",
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     address = Column(String(500), nullable=False)
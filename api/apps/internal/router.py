@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from .views import router as internal_views_router
+
+internal_router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"],
+)
+
+internal_router.include_router(internal_views_router)
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Response
+from fastapi.responses import JSONResponse
+from utils.admission import admission_controller
+from utils.db import pool_stats
+from utils.metrics import CONTENT_TYPE, registry
+from utils.readiness import readiness
+from utils.logger import get_logger
+
+router = APIRouter()
+metrics_router = APIRouter()
+health_router = APIRouter()
+logger = get_logger(__name__)
+
+
+@router.get("/pool")
+async def get_pool_stats():
+    """
+    Возвращает текущее состояние пула соединений с БД
+    """
+    logger.debug("HTTP get_pool_stats called")
+    return pool_stats()
+
+
+@router.get("/admission")
+async def get_admission_stats():
+    """
+    Возвращает состояние лимитеров запросов: занятые слоты, глубину очереди и число отказов
+    """
+    logger.debug("HTTP get_admission_stats called")
+    return admission_controller.stats()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Метрики процесса в текстовом формате Prometheus
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
+@health_router.get("/health", include_in_schema=False)
+async def get_health():
+    """
+    Liveness: процесс запущен и обслуживает event loop
+    """
+    return {"status": "ok"}
+
+
+@health_router.get("/ready", include_in_schema=False)
+async def get_readiness():
+    """
+    Readiness: 200 после прогрева пула соединений и кэшей, до этого и во время остановки 503
+    """
+    return JSONResponse(
+        status_code=200 if readiness.ready else 503, content=readiness.as_dict()
+    )
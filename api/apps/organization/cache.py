@@ -0,0 +1,26 @@
+import json
+
+from core.settings import get_settings
+from utils.cache import LRUCache, NullCache, RedisCache, ResponseCache
+
+settings = get_settings()
+
+
+def _build_backend():
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisCache.from_url(
+            settings.RESPONSE_CACHE_REDIS_URL, settings.RESPONSE_CACHE_TTL
+        )
+    if settings.RESPONSE_CACHE_BACKEND == "none":
+        return NullCache()
+    return LRUCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL)
+
+
+def build_cache_key(name: str, params: dict) -> str:
+    """Ключ кэша из имени запроса и нормализованных параметров"""
+    return name + ":" + json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+
+organization_response_cache = ResponseCache(
+    _build_backend(), name="organization_response"
+)
@@ -0,0 +1,194 @@
+import json
+import math
+import os
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
+
+from application import create_app
+from apps.activity.hierarchy import activity_hierarchy_cache
+from apps.activity.models import Activity, activity_closure
+from apps.building import geo
+from apps.building.geo import building_geo_index_cache
+from apps.building.models import Building
+from apps.organization.cache import organization_response_cache
+from apps.organization.models import Organization, organization_activities
+from apps.organization.services import busines
+from core.settings import get_settings
+from utils import db
+from utils.cache import NullCache
+from utils.db import Base, engine, get_read_session, get_session
+from utils.migrations import prepare_database
+from apps.organization.testing import (
+    DOCUMENTS,
+    POSTGRES,
+    POSTGRES_DOCUMENTS,
+    POSTGRES_TABLES,
+    SQLITE,
+    SQLITE_TABLES,
+)
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "fixtures"
+)
+API_KEY_HEADERS = {"Authorization": f"Bearer {get_settings().STATIC_API_KEY}"}
+
+# Функции Postgres, которых нет в SQLite: формула гаверсинусов и поиск по названию
+SQLITE_FUNCTIONS = {
+    "radians": (1, math.radians),
+    "sin": (1, math.sin),
+    "cos": (1, math.cos),
+    "asin": (1, math.asin),
+    "sqrt": (1, math.sqrt),
+    "power": (2, math.pow),
+    "least": (2, min),
+    "lower": (1, lambda value: value.lower() if value else value),
+    "word_similarity": (
+        2,
+        lambda query, value: float(query.lower() in (value or "").lower()),
+    ),
+}
+
+
+def _register_functions(dbapi_connection, connection_record):
+    for name, (arity, function) in SQLITE_FUNCTIONS.items():
+        dbapi_connection.create_function(name, arity, function)
+
+
+def _load_fixture(name: str) -> list:
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def _load_fixtures(factory):
+    async with factory() as session:
+        for name, model in (
+            ("buildings", Building),
+            ("organizations", Organization),
+            ("activities", Activity),
+        ):
+            session.add_all(model(**data) for data in _load_fixture(name))
+            await session.flush()
+        await session.execute(
+            organization_activities.insert(), _load_fixture("organization_activities")
+        )
+        await session.commit()
+
+
+async def _sqlite_engine():
+    sqlite = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    event.listen(sqlite.sync_engine, "connect", _register_functions)
+    # Документы поиска хранятся в массивах и JSONB Postgres, в SQLite их нет
+    tables = [
+        Building.__table__,
+        Organization.__table__,
+        Activity.__table__,
+        activity_closure,
+        organization_activities,
+    ]
+    async with sqlite.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=tables)
+    return sqlite
+
+
+_postgres_prepared = False
+
+
+async def _postgres_engine():
+    """Схема готовится миграциями один раз на запуск, данные очищаются перед каждым тестом"""
+    global _postgres_prepared
+    if not _postgres_prepared:
+        await prepare_database()
+        # Пул общего движка привязан к event loop этого теста
+        await engine.dispose()
+        _postgres_prepared = True
+    postgres = create_async_engine(get_settings().POSTGRES_URL, poolclass=NullPool)
+    async with postgres.begin() as conn:
+        await conn.execute(
+            text(
+                "TRUNCATE organization_search_documents, organization_activities, "
+                "organizations, activity_closure, activities, buildings "
+                "RESTART IDENTITY"
+            )
+        )
+    return postgres
+
+
+async def _sync_sequences(factory):
+    """Фикстуры вставляются с явными id: новые строки в тестах получат следующие"""
+    async with factory() as session:
+        for table in ("buildings", "organizations", "activities"):
+            await session.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"MAX(id)) FROM {table}"
+                )
+            )
+        await session.commit()
+
+
+@pytest.fixture(params=[SQLITE_TABLES, POSTGRES_TABLES, POSTGRES_DOCUMENTS])
+def backend(request):
+    """(БД, модель чтения). Тест только для одного варианта переопределяет его через
+    @pytest.mark.parametrize("backend", [...], indirect=True)"""
+    return request.param
+
+
+@pytest.fixture
+async def session_factory(backend, monkeypatch):
+    """БД с фикстурами из api/fixtures: SQLite в памяти или Postgres из TEST_POSTGRES_URL"""
+    database, read_model = backend
+    monkeypatch.setattr(get_settings(), "ORGANIZATION_READ_MODEL", read_model)
+    if database == SQLITE:
+        monkeypatch.setattr(geo, "_extensions", frozenset())
+        monkeypatch.setattr(geo, "_distance_backend", geo.PLAIN)
+        test_engine = await _sqlite_engine()
+    else:
+        monkeypatch.setattr(geo, "_extensions", None)
+        monkeypatch.setattr(geo, "_distance_backend", None)
+        test_engine = await _postgres_engine()
+    factory = sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    await _load_fixtures(factory)
+    async with factory() as session:
+        if database == POSTGRES:
+            await _sync_sequences(factory)
+            await geo.get_distance_backend(session)
+        # Снимок иерархии прогрет, как после старта приложения
+        await activity_hierarchy_cache.load(session)
+    yield factory
+    activity_hierarchy_cache.invalidate()
+    building_geo_index_cache.invalidate()
+    await test_engine.dispose()
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(session_factory, monkeypatch):
+    """Клиент приложения без кэша ответов: каждый запрос доходит до БД"""
+
+    async def override_session():
+        async with session_factory() as session:
+            yield session
+
+    @asynccontextmanager
+    async def own_session():
+        async with session_factory() as session:
+            yield session
+
+    monkeypatch.setattr(organization_response_cache, "backend", NullCache())
+    monkeypatch.setattr(busines, "read_session", own_session)
+    monkeypatch.setattr(db, "read_session", own_session)
+    app = create_app()
+    app.dependency_overrides[get_session] = override_session
+    app.dependency_overrides[get_read_session] = override_session
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://test",
+        headers=API_KEY_HEADERS,
+    ) as client:
+        yield client
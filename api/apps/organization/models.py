@@ -1,7 +1,28 @@
-from sqlalchemy import Column, Integer, String, UUID, ForeignKey, Table, select
-from apps.activity.models import Activity
+from sqlalchemy import (
+    Column,
+    Float,
+    Index,
+    Integer,
+    String,
+    UUID,
+    ForeignKey,
+    Table,
+    func,
+    inspect,
+    literal,
+    select,
+    text,
+    true,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from apps.activity.models import Activity, activity_closure
+from apps.activity.hierarchy import activity_hierarchy_cache
+from apps.building.geo import building_geo_index_cache
+from apps.building.models import Building
+from apps.organization.cache import organization_response_cache
 from utils.db import Base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, relationship
 from sqlalchemy import event
 from sqlalchemy.exc import InvalidRequestError
 
@@ -10,6 +31,14 @@ class Organization(Base):
     """Модель организации"""
 
     __tablename__ = "organizations"
+    __table_args__ = (
+        Index(
+            "ix_organizations_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -35,9 +64,69 @@ organization_activities = Table(
 )
 
 
+class OrganizationSearchDocument(Base):
+    """
+    Денормализованная модель чтения: одна строка на организацию с полями здания,
+    id привязанных активностей вместе с предками и готовым деревом активностей.
+    Поддерживается триггерами БД на organizations, buildings, activities,
+    activity_closure и organization_activities (миграция a3d9c6b1f072)
+    """
+
+    __tablename__ = "organization_search_documents"
+    __table_args__ = (
+        Index(
+            "ix_organization_search_documents_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_organization_search_documents_address_trgm",
+            "address",
+            postgresql_using="gin",
+            postgresql_ops={"address": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_organization_search_documents_activity_ids",
+            "activity_ids",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_organization_search_documents_latitude_longitude",
+            "latitude",
+            "longitude",
+        ),
+        Index(
+            "ix_organization_search_documents_ll_to_earth",
+            text("ll_to_earth(latitude, longitude)"),
+            postgresql_using="gist",
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    id = Column(
+        Integer,
+        ForeignKey("organizations.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    name = Column(String(255), nullable=False)
+    phone = Column(String(12), nullable=True)
+    building_id = Column(Integer, nullable=False)
+    address = Column(String(500), nullable=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    activity_ids = Column(ARRAY(Integer), nullable=False, server_default="{}")
+    activity_tree = Column(JSONB, nullable=False, server_default="[]")
+
+    def __repr__(self):
+        return f"<OrganizationSearchDocument(id={self.id}, name='{self.name}')>"
+
+
+MAX_ACTIVITY_DEPTH = 3
+
+
 def restrict_activity_depth(mapper, connection, target):
     """Ограничивает уровень вложенности активности при вставке"""
-    max_depth = 3
+    max_depth = MAX_ACTIVITY_DEPTH
     if target.parent_id is not None:
         depth = _get_activity_depth(connection, target.parent_id)
         if depth >= max_depth:
@@ -46,14 +135,152 @@ def restrict_activity_depth(mapper, connection, target):
             )
 
 
+def restrict_activity_move(mapper, connection, target):
+    """Ограничивает уровень вложенности и не даёт создать цикл при смене родителя"""
+    max_depth = MAX_ACTIVITY_DEPTH
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+    if target.parent_id is None:
+        return
+    subtree = connection.execute(
+        select(activity_closure.c.descendant_id, activity_closure.c.depth).where(
+            activity_closure.c.ancestor_id == target.id
+        )
+    ).all()
+    if target.parent_id in {row.descendant_id for row in subtree}:
+        raise InvalidRequestError("Нельзя сделать активность потомком самой себя")
+    height = max((row.depth for row in subtree), default=0)
+    if _get_activity_depth(connection, target.parent_id) + height >= max_depth:
+        raise InvalidRequestError(
+            f"Нельзя добавить еще один уровень вложенности. Максимальный уровень: {max_depth}"
+        )
+
+
 def _get_activity_depth(connection, activity_id: int) -> int:
-    """Рекурсивно вычисляет глубину активности"""
+    """Вычисляет глубину активности по таблице замыкания: сколько у неё предков, включая её саму"""
     if not activity_id:
         return 0
-    result = connection.execute(
-        select(Activity.parent_id).where(Activity.id == activity_id)
+    return connection.execute(
+        select(func.count()).where(activity_closure.c.descendant_id == activity_id)
     ).scalar()
-    return 1 + _get_activity_depth(connection, result) if result else 1
+
+
+def insert_activity_closure(mapper, connection, target):
+    """Добавляет в таблицу замыкания новую активность и пути от всех её предков"""
+    paths = select(
+        literal(target.id).label("ancestor_id"),
+        literal(target.id).label("descendant_id"),
+        literal(0).label("depth"),
+    )
+    if target.parent_id is not None:
+        paths = union_all(
+            paths,
+            select(
+                activity_closure.c.ancestor_id,
+                literal(target.id),
+                activity_closure.c.depth + 1,
+            ).where(activity_closure.c.descendant_id == target.parent_id),
+        )
+    connection.execute(
+        activity_closure.insert().from_select(
+            ["ancestor_id", "descendant_id", "depth"], paths
+        )
+    )
+
+
+def move_activity_closure(mapper, connection, target):
+    """Переносит в таблице замыкания всё поддерево активности под нового родителя"""
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+    subtree_paths = activity_closure.alias("subtree_paths")
+    subtree = (
+        select(subtree_paths.c.descendant_id)
+        .where(subtree_paths.c.ancestor_id == target.id)
+        .scalar_subquery()
+    )
+    # Старые пути от внешних предков к поддереву
+    connection.execute(
+        activity_closure.delete().where(
+            activity_closure.c.descendant_id.in_(subtree),
+            activity_closure.c.ancestor_id.not_in(subtree),
+        )
+    )
+    if target.parent_id is None:
+        return
+    ancestors = activity_closure.alias("ancestors")
+    descendants = activity_closure.alias("descendants")
+    connection.execute(
+        activity_closure.insert().from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                ancestors.c.ancestor_id,
+                descendants.c.descendant_id,
+                ancestors.c.depth + descendants.c.depth + 1,
+            )
+            .select_from(ancestors.join(descendants, true()))
+            .where(
+                ancestors.c.descendant_id == target.parent_id,
+                descendants.c.ancestor_id == target.id,
+            ),
+        )
+    )
 
 
 event.listens_for(Activity, "before_insert")(restrict_activity_depth)
+event.listens_for(Activity, "before_update")(restrict_activity_move)
+event.listens_for(Activity, "after_insert")(insert_activity_closure)
+event.listens_for(Activity, "after_update")(move_activity_closure)
+
+
+DATA_CHANGED_KEY = "organization_data_changed"
+# Снимки кэшей сбрасываются только после коммита: сброс при flush дал бы
+# параллельному запросу перечитать ещё не зафиксированное состояние и держать его до TTL
+SNAPSHOT_CACHES = {
+    "activities_changed": (Activity, activity_hierarchy_cache),
+    "buildings_changed": (Building, building_geo_index_cache),
+}
+
+
+def mark_changed_on_flush(session, flush_context):
+    """Отмечает сессию, если в ней менялись организации, здания или активности"""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Organization, Building, Activity)):
+            session.info[DATA_CHANGED_KEY] = True
+        for key, (model, _) in SNAPSHOT_CACHES.items():
+            if isinstance(obj, model):
+                session.info[key] = True
+
+
+def mark_changed_on_execute(orm_execute_state):
+    """Отмечает сессию при INSERT/UPDATE/DELETE в обход ORM-объектов"""
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info[DATA_CHANGED_KEY] = True
+        mapper = orm_execute_state.bind_mapper
+        for key, (model, _) in SNAPSHOT_CACHES.items():
+            if mapper is not None and mapper.class_ is model:
+                orm_execute_state.session.info[key] = True
+
+
+def invalidate_caches(session):
+    """Сбрасывает кэш ответов и снимки иерархии и зданий только после фиксации изменений"""
+    if session.info.pop(DATA_CHANGED_KEY, False):
+        organization_response_cache.invalidate()
+    for key, (_, cache) in SNAPSHOT_CACHES.items():
+        if session.info.pop(key, False):
+            cache.invalidate()
+
+
+def forget_changes(session):
+    session.info.pop(DATA_CHANGED_KEY, None)
+    for key in SNAPSHOT_CACHES:
+        session.info.pop(key, None)
+
+
+event.listen(Session, "after_flush", mark_changed_on_flush)
+event.listen(Session, "do_orm_execute", mark_changed_on_execute)
+event.listen(Session, "after_commit", invalidate_caches)
+event.listen(Session, "after_rollback", forget_changes)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from .views import router as org_router
+from .views import export_router, router as org_router
 
 organizations_router = APIRouter(
     prefix="/organizations",
@@ -11,3 +11,4 @@ organizations_router.include_router(
     org_router,
     prefix="/organization",
 )
+organizations_router.include_router(export_router)
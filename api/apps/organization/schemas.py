@@ -1,35 +1,113 @@
-from typing import List
+from typing import List, Literal
 from fastapi import Query
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, Field, model_validator
 from fastapi import exceptions
 
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+MAX_BATCH_IDS = 500
+SEARCH_FIELDS = ("building_name", "organization_name", "activity_name")
+
+
+class PaginationSchema(BaseModel):
+    limit: int = Query(
+        default=DEFAULT_PAGE_LIMIT,
+        ge=1,
+        le=MAX_PAGE_LIMIT,
+        description="Максимальное количество организаций на странице",
+    )
+    cursor: str | None = Query(
+        default=None,
+        description="Курсор следующей страницы из поля next_cursor предыдущего ответа",
+    )
+
+
+class SearchFiltersSchema(PaginationSchema):
+    """Фильтры поиска, переданные вместе, объединяются через И"""
 
-class GetOrganizationsRequestSchema(BaseModel):
     building_name: str | None = Query(default=None, description="Имя или id строения")
     organization_name: str | None = Query(
         default=None, description="Имя или id организации"
     )
     activity_name: str | None = Query(
-        default=None, description="Имя или id вида деятельности"
+        default=None,
+        description="Имя или id вида деятельности, учитываются и дочерние виды",
+    )
+
+    def normalized(self):
+        """
+        Приводит строки поиска к одному виду. Поиск регистронезависимый,
+        поэтому результат не меняется, а одинаковые запросы получают один ключ кэша
+        """
+        return self.model_copy(
+            update={
+                field: value.strip().lower() or None
+                for field in SEARCH_FIELDS
+                if (value := getattr(self, field)) is not None
+            }
+        )
+
+
+class GetOrganizationsRequestSchema(SearchFiltersSchema):
+    current_latitude: float | None = Query(
+        default=None, description="Широта центра круга для фильтра по расстоянию"
+    )
+    current_longitude: float | None = Query(
+        default=None, description="Долгота центра круга для фильтра по расстоянию"
+    )
+    radius: int | None = Query(
+        default=None, description="Радиус круга для фильтра по расстоянию в метрах"
+    )
+    order_by: Literal["id", "relevance"] = Query(
+        default="id",
+        description="Порядок выдачи: по id или по похожести на строки поиска",
     )
 
     @model_validator(mode="after")
-    def check_exactly_one_field_is_not_none(self) -> "GetOrganizationsRequestSchema":
-        non_none_fields = [
-            field for field, value in self.model_dump().items() if value is not None
-        ]
-        if len(non_none_fields) > 1:
+    def check_geo_filter_is_complete(self) -> "GetOrganizationsRequestSchema":
+        geo_fields = (self.current_latitude, self.current_longitude, self.radius)
+        if any(value is None for value in geo_fields) and any(
+            value is not None for value in geo_fields
+        ):
             raise exceptions.HTTPException(
-                status_code=400, detail="Максимум одно поле должно быть не None"
+                status_code=400,
+                detail="Фильтр по расстоянию требует current_latitude, current_longitude и radius",
             )
         return self
 
+    @property
+    def has_geo_filter(self) -> bool:
+        return self.radius is not None
+
 
-class GetOrganizationsByGeoRequestSchema(BaseModel):
+class GetOrganizationsByGeoRequestSchema(SearchFiltersSchema):
     current_latitude: float = Query(description="Текущая широта пользователя")
     current_longitude: float = Query(description="Текущая долгота пользователя")
-    radius: int = Query(
-        description="Радиус поиска организации в метрах от текущего местоположения",
+    radius: int | None = Query(
+        default=None,
+        description="Радиус поиска организации в метрах от текущего местоположения. "
+        "Если не задан, возвращаются limit ближайших организаций",
+    )
+
+    def snapped(self, grid: float) -> "GetOrganizationsByGeoRequestSchema":
+        """Округляет координаты до сетки с шагом grid градусов, чтобы соседние точки делили кэш"""
+        return self.model_copy(
+            update={
+                "current_latitude": round(
+                    round(self.current_latitude / grid) * grid, 7
+                ),
+                "current_longitude": round(
+                    round(self.current_longitude / grid) * grid, 7
+                ),
+            }
+        )
+
+
+class GetOrganizationsByIdsRequestSchema(BaseModel):
+    ids: List[int] = Field(
+        min_length=1,
+        max_length=MAX_BATCH_IDS,
+        description="id организаций, ответ придёт в том же порядке",
     )
 
 
@@ -51,7 +129,8 @@ class OrganizationResponseSchema(BaseModel):
     name: str
     building: BuildingSchema
     activity_tree: List[ActivityTreeSchema]
-    phone_number: str
+    phone_number: str | None
+    distance: float | None = None
 
     class Config:
         from_attributes = True
@@ -59,3 +138,9 @@ class OrganizationResponseSchema(BaseModel):
 
 class GetOrganizationListResponseSchema(BaseModel):
     organizations: List[OrganizationResponseSchema]
+    next_cursor: str | None = None
+
+
+class GetOrganizationsByIdsResponseSchema(BaseModel):
+    organizations: List[OrganizationResponseSchema]
+    missing_ids: List[int]
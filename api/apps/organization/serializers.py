@@ -0,0 +1,23 @@
+from typing import List
+
+
+def organization_to_dict(
+    row, activity_tree: List[dict], distance: float | None = None
+) -> dict:
+    """
+    Собирает ответ для одной организации из строки запроса без ORM-объектов и pydantic.
+    Структура совпадает с OrganizationResponseSchema
+    """
+    return {
+        "id": row.id,
+        "name": row.name,
+        "building": {
+            "id": row.building_id,
+            "address": row.address,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+        },
+        "activity_tree": activity_tree,
+        "phone_number": row.phone,
+        "distance": distance,
+    }
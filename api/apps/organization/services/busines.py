@@ -1,242 +1,531 @@
-from typing import List, Set
-from apps.organization.models import Organization, organization_activities
-from apps.activity.models import Activity
+from typing import AsyncIterator, Dict, List, Tuple
+from apps.organization.models import (
+    Organization,
+    OrganizationSearchDocument,
+    organization_activities,
+)
+from apps.activity.models import Activity, activity_closure
+from apps.activity.hierarchy import activity_hierarchy_cache
 from apps.building.models import Building
+from apps.building import geo
+from apps.building.geo import building_geo_index_cache
+from core.settings import get_settings
 from apps.organization.schemas import (
-    BuildingSchema,
-    GetOrganizationListResponseSchema,
     GetOrganizationsByGeoRequestSchema,
     GetOrganizationsRequestSchema,
-    OrganizationResponseSchema,
-    ActivityTreeSchema,
+    PaginationSchema,
+    SearchFiltersSchema,
 )
+from apps.organization.serializers import organization_to_dict
+from fastapi import exceptions
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import func, select, or_
-from geopy.distance import geodesic
+from sqlalchemy import Integer, Row, and_, bindparam, func, select, or_
+from sqlalchemy.dialects.postgresql import ARRAY
+from utils.db import read_session, run_in_read_session
 from utils.logger import get_logger
+from utils.metrics import timed
+from utils.pagination import decode_cursor, encode_cursor
 
 logger = get_logger(__name__)
+settings = get_settings()
 
 
 class OrganizationBusinessService:
     @classmethod
     async def __serialize_list_response(
-        cls, organizations, db: AsyncSession
-    ) -> GetOrganizationListResponseSchema:
+        cls,
+        rows,
+        db: AsyncSession,
+        distances: Dict[int, float] | None = None,
+        next_cursor: str | None = None,
+    ) -> dict:
         """
-        Функция для сериализации списка организаций для ЛЮБОГО запроса с поиском организаций
+        Функция для сериализации списка организаций для ЛЮБОГО запроса с поиском организаций.
+        Ответ собирается словарями прямо из строк запроса и кодируется без повторной валидации
         """
-        logger.debug(
-            "Serializing %d organizations", len(organizations) if organizations else 0
-        )
-        __organizations = []
-        for org in organizations:
-            org.activity_tree = await cls.__build_activity_tree_for_org(
-                org.activities, db
-            )
-            org.phone_number = org.phone
-            __organizations.append(
-                OrganizationResponseSchema(
-                    id=org.id,
-                    name=org.name,
-                    building=BuildingSchema(
-                        id=org.building.id,
-                        address=org.building.address,
-                        latitude=org.building.latitude,
-                        longitude=org.building.longitude,
-                    ),
-                    activity_tree=org.activity_tree,
-                    phone_number=org.phone,
-                )
-            )
-        return GetOrganizationListResponseSchema(organizations=__organizations)
+        logger.debug("Serializing %d organizations", len(rows))
+        activity_trees = await cls.__activity_trees(rows, db)
+        distances = distances or {}
+        return {
+            "organizations": [
+                organization_to_dict(row, activity_trees[row.id], distances.get(row.id))
+                for row in rows
+            ],
+            "next_cursor": next_cursor,
+        }
 
     @classmethod
-    async def __build_activity_tree_for_org(
-        cls,
-        activities,
-        db: AsyncSession,
-    ) -> List[ActivityTreeSchema]:
-        """Строит дерево активностей для одной организации"""
-
-        async def _collect_parents(db: AsyncSession, activity: Activity, ids: Set[int]):
-            """Рекурсивно собирает ID родителей активности"""
-            ids.add(activity.id)
-            if activity.parent_id and activity.parent is None:
-                # Если parent не подгружен, загружаем явно
-                stmt = (
-                    select(Activity)
-                    .where(Activity.id == activity.parent_id)
-                    .options(selectinload(Activity.parent))
-                )
-                result = await db.execute(stmt)
-                activity.parent = result.scalars().first()
-            if activity.parent:
-                await _collect_parents(db, activity.parent, ids)
-                if not activities:
-                    return []
-
-        activity_ids = set()
-        for act in activities:
-            await _collect_parents(db, act, activity_ids)
-
-        stmt = (
-            select(Activity)
-            .where(Activity.id.in_(activity_ids))
-            .options(selectinload(Activity.children).selectinload(Activity.children))
+    @timed("organization")
+    async def __build_activity_trees(
+        cls, organization_ids: List[int], db: AsyncSession
+    ) -> Dict[int, List[dict]]:
+        """
+        Строит деревья активностей сразу для всех организаций по кэшу иерархии.
+        Из БД одним запросом берутся только пары (организация, активность)
+        """
+        activity_ids: Dict[int, List[int]] = {org_id: [] for org_id in organization_ids}
+        if not activity_ids:
+            return activity_ids
+        result = await db.execute(
+            select(
+                organization_activities.c.organization_id,
+                organization_activities.c.activity_id,
+            ).where(organization_activities.c.organization_id.in_(activity_ids))
         )
-        result = await db.execute(stmt)
-        all_activities = result.scalars().all()
+        for org_id, activity_id in result.tuples():
+            activity_ids[org_id].append(activity_id)
+        linked_ids = {
+            activity_id for ids in activity_ids.values() for activity_id in ids
+        }
+        hierarchy = await activity_hierarchy_cache.get(db, required_ids=linked_ids)
+        return {
+            org_id: hierarchy.build_trees(ids) for org_id, ids in activity_ids.items()
+        }
 
-        # Создаём словарь для быстрого доступа
-        activity_map = {act.id: act for act in all_activities}
-
-        root_ids = [act.id for act in all_activities if act.parent_id is None]
-        if not root_ids:
-            root_ids = list(activity_ids - {act.id for act in activities})
+    @classmethod
+    async def __activity_trees(cls, rows, db: AsyncSession) -> Dict[int, List[dict]]:
+        """Деревья активностей для строк запроса: готовые из документов или собранные заново"""
+        if cls.__use_documents():
+            return {row.id: row.activity_tree for row in rows}
+        return await cls.__build_activity_trees([row.id for row in rows], db)
 
-        roots = [act for act in all_activities if act.id in root_ids]
+    @staticmethod
+    def __use_documents() -> bool:
+        return settings.ORGANIZATION_READ_MODEL == "documents"
 
-        def _build_tree(act: Activity) -> ActivityTreeSchema:
-            children = [
-                _build_tree(activity_map[child.id])
-                for child in act.children
-                if child.id in activity_ids
-            ]
-            return ActivityTreeSchema(id=act.id, name=act.name, children=children)
+    @classmethod
+    def __sources(cls):
+        """
+        Модели, из которых читаются поля организации и здания:
+        обе - документ поиска, либо organizations и buildings
+        """
+        if cls.__use_documents():
+            return OrganizationSearchDocument, OrganizationSearchDocument
+        return Organization, Building
 
-        return [_build_tree(root) for root in roots]
+    @classmethod
+    def __select(cls, *columns):
+        """Запрос колонок модели чтения, без документов организации соединяются со зданиями"""
+        query = select(*columns)
+        if not cls.__use_documents():
+            query = query.join(Building, Organization.building_id == Building.id)
+        return query
 
     @classmethod
-    async def __get_organization_by_building(
-        cls, building: str, db: AsyncSession
-    ) -> GetOrganizationListResponseSchema:
-        """
-        Позволяет искать организации по зданию, можно ввести id постройки или ее название
-        """
-        logger.info("Searching organizations by building: %s", building)
-        query = select(Organization).options(
-            selectinload(Organization.building),
-            selectinload(Organization.activities)
-            .selectinload(Activity.parent)
-            .selectinload(Activity.children),
-        )
-        query = query.join(
-            Building, Organization.building_id == Building.id, isouter=False
-        ).filter(Building.address.ilike(f"%{building}%"))
-        result = await db.execute(query)
-        organizations = result.scalars().unique().all()
-        return await cls.__serialize_list_response(organizations, db)
+    def __base_query(cls):
+        """Плоские колонки организации и её здания, без загрузки ORM-объектов"""
+        organization, building = cls.__sources()
+        columns = [
+            organization.id,
+            organization.name,
+            organization.phone,
+            organization.building_id,
+            building.address,
+            building.latitude,
+            building.longitude,
+        ]
+        if cls.__use_documents():
+            # Дерево активностей в документе уже собрано
+            columns.append(OrganizationSearchDocument.activity_tree)
+        return cls.__select(*columns)
 
     @classmethod
-    async def __get_organizations_by_activity(
-        cls, activity: str, db: AsyncSession
-    ) -> GetOrganizationListResponseSchema:
-        """
-        Позволяет искать организации по видам деятельности, можно ввести id вида деятельности или его название
-        """
-        logger.info("Searching organizations by activity: %s", activity)
-        query = select(Organization).options(
-            selectinload(Organization.building),
-            selectinload(Organization.activities)
-            .selectinload(Activity.parent)
-            .selectinload(Activity.children),
+    async def __paginate(
+        cls,
+        query,
+        page: PaginationSchema,
+        db: AsyncSession,
+        rank=None,
+        with_distance: bool = False,
+    ) -> dict:
+        """
+        Ограничивает запрос страницей по ключу organizations.id,
+        а при переданном rank - по ключу (rank по убыванию, id).
+        Берётся на одну запись больше, чтобы понять, есть ли следующая страница.
+        with_distance - в запросе есть колонка distance, она попадает в ответ
+        """
+        organization, _ = cls.__sources()
+        if rank is None:
+            if page.cursor:
+                (after_id,) = decode_cursor(page.cursor, (int,))
+                query = query.where(organization.id > after_id)
+            query = query.order_by(organization.id)
+        else:
+            rank = rank.label("rank")
+            query = query.add_columns(rank)
+            if page.cursor:
+                after_rank, after_id = decode_cursor(page.cursor, (float, int))
+                query = query.where(
+                    or_(
+                        rank < after_rank,
+                        and_(rank == after_rank, organization.id > after_id),
+                    )
+                )
+            query = query.order_by(rank.desc(), organization.id)
+        result = await db.execute(query.limit(page.limit + 1))
+        rows = result.all()
+        next_cursor = None
+        if len(rows) > page.limit:
+            rows = rows[: page.limit]
+            last = rows[-1]
+            next_cursor = (
+                encode_cursor(last.id)
+                if rank is None
+                else encode_cursor(last.rank, last.id)
+            )
+        distances = (
+            {row.id: round(row.distance, 2) for row in rows} if with_distance else None
         )
+        return await cls.__serialize_list_response(rows, db, distances, next_cursor)
 
+    @classmethod
+    def __activity_filter(cls, activity: str):
+        """
+        Организация привязана к виду деятельности с подходящим id или именем
+        либо к любому его потомку
+        """
         if activity.isdigit():
-            activity_id = int(activity)
-            query = query.filter(
-                or_(Activity.id == activity_id, Activity.name.ilike(f"%{activity}%"))
+            condition = or_(
+                Activity.id == int(activity), Activity.name.ilike(f"%{activity}%")
             )
         else:
-            query = (
-                query.join(
-                    organization_activities,
-                    organization_activities.c.organization_id == Organization.id,
-                    isouter=False,
-                )
-                .join(
-                    Activity,
-                    organization_activities.c.activity_id == Activity.id,
-                    isouter=False,
-                )
-                .filter(Activity.name.ilike(f"%{activity}%"))
+            condition = Activity.name.ilike(f"%{activity}%")
+        if cls.__use_documents():
+            # В документе id активностей уже вместе с предками: организация подходит,
+            # если среди них есть подходящая активность. Пересечение массивов идёт по GIN
+            matched = select(Activity.id).where(condition).scalar_subquery()
+            return OrganizationSearchDocument.activity_ids.overlap(
+                func.array(matched, type_=ARRAY(Integer))
             )
+        # Поддерево берётся из таблицы замыкания одним индексным соединением.
+        # EXISTS вместо JOIN, чтобы организация с несколькими подходящими
+        # активностями не занимала несколько мест в странице
+        subtree = (
+            select(activity_closure.c.descendant_id)
+            .join(Activity, Activity.id == activity_closure.c.ancestor_id)
+            .where(condition)
+        )
+        return Organization.activities.any(Activity.id.in_(subtree))
 
-        result = await db.execute(query)
-        organizations = result.scalars().unique().all()
-        return await cls.__serialize_list_response(organizations, db)
+    @staticmethod
+    def __relevance(term: str, column):
+        """Похожесть строки поиска на колонку, считается по триграммному индексу"""
+        return func.word_similarity(term, column)
 
     @classmethod
-    async def __get_organizations_by_name(
-        cls, name: str, db: AsyncSession
-    ) -> GetOrganizationListResponseSchema:
-        """
-        Позволяет искать организации по имени, можно ввести полное или частичное имя организации или его id
-        """
-        logger.info("Searching organizations by name: %s", name)
-        query = select(Organization).options(
-            selectinload(Organization.building),
-            selectinload(Organization.activities)
-            .selectinload(Activity.parent)
-            .selectinload(Activity.children),
-        )
-        if name.isdigit():
-            query = query.filter(
-                or_(Organization.id == int(name)), Organization.name.ilike(f"%{name}%")
+    def __search_conditions(cls, filters: SearchFiltersSchema) -> List:
+        """
+        Условия для всех переданных фильтров, в запросе они объединяются через И.
+        Каждое обслуживается своим индексом: триграммными по имени и адресу,
+        таблицей замыкания по виду деятельности
+        """
+        organization, building_source = cls.__sources()
+        conditions = []
+        if name := filters.organization_name:
+            condition = organization.name.ilike(f"%{name}%")
+            if name.isdigit():
+                condition = or_(organization.id == int(name), condition)
+            conditions.append(condition)
+        if building := filters.building_name:
+            conditions.append(building_source.address.ilike(f"%{building}%"))
+        if activity := filters.activity_name:
+            conditions.append(cls.__activity_filter(activity))
+        return conditions
+
+    @classmethod
+    def __search_rank(cls, filters: SearchFiltersSchema):
+        """Сумма похожестей строк поиска на их колонки, None без строк поиска"""
+        organization, building_source = cls.__sources()
+        ranks = []
+        if name := filters.organization_name:
+            ranks.append(cls.__relevance(name, organization.name))
+        if building := filters.building_name:
+            ranks.append(cls.__relevance(building, building_source.address))
+        if activity := filters.activity_name:
+            ranks.append(cls.__activity_rank(activity))
+        return sum(ranks[1:], ranks[0]) if ranks else None
+
+    @classmethod
+    def __activity_rank(cls, activity: str):
+        """Наибольшая похожесть строки поиска на привязанные активности и их предков"""
+        if cls.__use_documents():
+            return (
+                select(func.max(cls.__relevance(activity, Activity.name)))
+                .where(Activity.id == OrganizationSearchDocument.activity_ids.any_())
+                .scalar_subquery()
             )
-        else:
-            query = query.filter(Organization.name.ilike(f"%{name}%"))
-        result = await db.execute(query)
-        organizations = result.scalars().unique().all()
-        return await cls.__serialize_list_response(organizations, db)
+        return (
+            select(func.max(cls.__relevance(activity, Activity.name)))
+            .select_from(organization_activities)
+            .join(
+                activity_closure,
+                activity_closure.c.descendant_id
+                == organization_activities.c.activity_id,
+            )
+            .join(Activity, Activity.id == activity_closure.c.ancestor_id)
+            .where(organization_activities.c.organization_id == Organization.id)
+            .scalar_subquery()
+        )
 
     @classmethod
-    async def __get_all_organizations(
-        cls, db: AsyncSession
-    ) -> GetOrganizationListResponseSchema:
+    @timed("organization")
+    async def __search_organizations(
+        cls, query_params: GetOrganizationsRequestSchema, db: AsyncSession
+    ) -> dict:
         """
-        Позволяет получить все организации
+        Позволяет искать организации по любому сочетанию имени, здания, вида деятельности
+        и круга на карте. Все фильтры собираются в один SQL-запрос, без фильтров
+        возвращаются все организации
         """
-        logger.info("Fetching all organizations from DB")
-        query = select(Organization).options(
-            selectinload(Organization.building), selectinload(Organization.activities)
+        logger.info(
+            "Searching organizations with filters: %s",
+            query_params.model_dump(exclude_none=True, exclude={"cursor"}),
         )
-        result = await db.execute(query)
-        organizations = result.scalars().all()
-        return await cls.__serialize_list_response(organizations, db)
+        query = cls.__base_query().where(*cls.__search_conditions(query_params))
+        distance = None
+        if query_params.has_geo_filter:
+            latitude = query_params.current_latitude
+            longitude = query_params.current_longitude
+            _, building = cls.__sources()
+            backend = await geo.get_distance_backend(db)
+            distance = geo.distance_expression(
+                latitude, longitude, backend, building
+            ).label("distance")
+            # Квадрат отсекает кандидатов по индексу, точное расстояние считается только для них
+            query = query.add_columns(distance).where(
+                *geo.within_bounding_box(
+                    latitude, longitude, query_params.radius, building
+                ),
+                distance <= query_params.radius,
+            )
+        rank = None
+        if query_params.order_by == "relevance":
+            rank = cls.__search_rank(query_params)
+        return await cls.__paginate(query, query_params, db, rank, distance is not None)
 
     @classmethod
+    @timed("organization")
     async def __get_organizations_by_geo(
-        cls, latitude: float, longitude: float, radius: int, db: AsyncSession
-    ) -> GetOrganizationListResponseSchema:
+        cls,
+        latitude: float,
+        longitude: float,
+        radius: int | None,
+        conditions: List,
+        page: PaginationSchema,
+        db: AsyncSession,
+    ) -> dict:
         """
-        Позволяет искать организации по геолокации (широта и долгота)
+        Позволяет искать организации по геолокации (широта и долгота), ближайшие первыми.
+        С radius возвращаются организации в этом радиусе, без него - limit ближайших.
+        Страницы строятся по ключу (ключ сортировки по расстоянию, id)
         """
         logger.info(
             "Searching organizations by geo coords: (%s, %s)", latitude, longitude
         )
-        query = select(Organization).options(
-            selectinload(Organization.building),
-            selectinload(Organization.activities)
-            .selectinload(Activity.parent)
-            .selectinload(Activity.children),
+        after = decode_cursor(page.cursor, (float, int)) if page.cursor else None
+        if settings.GEO_SEARCH_ENGINE == "numpy":
+            search = cls.__get_organizations_by_geo_in_memory
+        elif await geo.has_knn_index(db):
+            search = cls.__get_nearest_organizations_by_index
+        else:
+            search = cls.__get_organizations_by_geo_in_boxes
+        rows = await search(
+            latitude, longitude, radius, conditions, page.limit + 1, after, db
         )
 
-        def is_within_radius(org):
-            # TODO : исправить бы на pg-геолокацию
-            org_location = (org.building.latitude, org.building.longitude)
-            user_location = (latitude, longitude)
-            distance = geodesic(user_location, org_location).meters
-            return distance <= radius
+        next_cursor = None
+        if len(rows) > page.limit:
+            rows = rows[: page.limit]
+            row, _, sort_key = rows[-1]
+            next_cursor = encode_cursor(sort_key, row.id)
+        distances = {row.id: round(dist, 2) for row, dist, _ in rows}
+        return await cls.__serialize_list_response(
+            [row for row, _, _ in rows], db, distances, next_cursor
+        )
 
+    @classmethod
+    def __geo_page_query(cls, distance, sort_key, conditions, after, limit):
+        """Организации с расстоянием, по возрастанию (sort_key, id) после ключа after"""
+        organization, _ = cls.__sources()
+        query = cls.__base_query().add_columns(distance).where(*conditions)
+        if after:
+            after_key, after_id = after
+            query = query.where(
+                or_(
+                    sort_key > after_key,
+                    and_(sort_key == after_key, organization.id > after_id),
+                )
+            )
+        return query.order_by(sort_key, organization.id).limit(limit)
+
+    @classmethod
+    @timed("organization")
+    async def __get_nearest_organizations_by_index(
+        cls,
+        latitude: float,
+        longitude: float,
+        radius: int | None,
+        conditions: List,
+        limit: int,
+        after: List | None,
+        db: AsyncSession,
+    ) -> List[Tuple[Row, float, float]]:
+        """
+        Ближайшие организации по GiST-индексу ll_to_earth: Postgres читает здания
+        (или документы) в порядке расстояния и останавливается на limit-й подходящей
+        организации, поэтому стоимость не растёт с общим числом зданий
+        """
+        _, building = cls.__sources()
+        backend = await geo.get_distance_backend(db)
+        distance = geo.distance_expression(
+            latitude, longitude, backend, building
+        ).label("distance")
+        knn = geo.knn_order_expression(latitude, longitude, building).label("knn")
+        query = cls.__geo_page_query(distance, knn, conditions, after, limit)
+        query = query.add_columns(knn)
+        if radius is not None:
+            query = query.where(
+                geo.within_earth_box(latitude, longitude, radius, building),
+                distance <= radius,
+            )
         result = await db.execute(query)
-        organizations = list(filter(is_within_radius, result.scalars().all()))
+        return [(row, row.distance, row.knn) for row in result.all()]
 
-        return await cls.__serialize_list_response(organizations, db)
+    @classmethod
+    @timed("organization")
+    async def __get_organizations_by_geo_in_boxes(
+        cls,
+        latitude: float,
+        longitude: float,
+        radius: int | None,
+        conditions: List,
+        limit: int,
+        after: List | None,
+        db: AsyncSession,
+    ) -> List[Tuple[Row, float, float]]:
+        """
+        Поиск без индекса ближайших: квадрат отсекает кандидатов по индексу координат,
+        точное расстояние считается только для них. Без radius квадрат расширяется,
+        пока в круге не наберётся limit организаций
+        """
+        _, building = cls.__sources()
+        backend = await geo.get_distance_backend(db)
+        distance = geo.distance_expression(
+            latitude, longitude, backend, building
+        ).label("distance")
+        search_radius = (
+            radius if radius is not None else settings.GEO_KNN_INITIAL_RADIUS
+        )
+        while True:
+            query = cls.__geo_page_query(
+                distance, distance, conditions, after, limit
+            ).where(
+                *geo.within_bounding_box(latitude, longitude, search_radius, building),
+                distance <= search_radius,
+            )
+            result = await db.execute(query)
+            rows = result.all()
+            # Всё, что ближе search_radius, уже найдено, значит найденные - ближайшие
+            if (
+                len(rows) >= limit
+                or radius is not None
+                or search_radius >= geo.MAX_EARTH_DISTANCE
+            ):
+                return [(row, row.distance, row.distance) for row in rows]
+            search_radius = min(
+                search_radius * geo.KNN_SEARCH_GROWTH, geo.MAX_EARTH_DISTANCE
+            )
 
     @classmethod
+    @timed("organization")
+    async def __get_organizations_by_geo_in_memory(
+        cls,
+        latitude: float,
+        longitude: float,
+        radius: int | None,
+        conditions: List,
+        limit: int,
+        after: List | None,
+        db: AsyncSession,
+    ) -> List[Tuple[Row, float, float]]:
+        """
+        Запасной гео-поиск: расстояния до всех зданий считаются векторно по кэшу координат,
+        из БД достаются только организации в найденных зданиях. Без radius берутся
+        ближайшие здания, их число растёт, пока не наберётся limit организаций.
+        Возвращает до limit троек (организация, расстояние, расстояние) после ключа after
+        """
+        index = await building_geo_index_cache.get(db)
+        if radius is not None:
+            building_ids, building_distances = index.within_radius(
+                latitude, longitude, radius
+            )
+            keys = await cls.__organization_geo_keys(
+                building_ids, building_distances, conditions, after, db
+            )
+        else:
+            take = limit
+            while True:
+                building_ids, building_distances = index.nearest(
+                    latitude, longitude, take
+                )
+                keys = await cls.__organization_geo_keys(
+                    building_ids, building_distances, conditions, after, db
+                )
+                if len(keys) >= limit or len(building_ids) < take:
+                    break
+                take *= geo.KNN_SEARCH_GROWTH
+        keys = keys[:limit]
+        if not keys:
+            return []
+        organization, _ = cls.__sources()
+        result = await db.execute(
+            cls.__base_query().where(
+                organization.id
+                == func.any(
+                    bindparam(
+                        "organization_ids", [key[1] for key in keys], ARRAY(Integer)
+                    )
+                )
+            )
+        )
+        organizations = {row.id: row for row in result.all()}
+        return [(organizations[org_id], dist, dist) for dist, org_id in keys]
+
+    @classmethod
+    async def __organization_geo_keys(
+        cls, building_ids, building_distances, conditions, after, db: AsyncSession
+    ) -> List[Tuple[float, int]]:
+        """Отсортированные ключи (расстояние, id) организаций в найденных зданиях"""
+        if not len(building_ids):
+            return []
+        distance_by_building = dict(
+            zip(building_ids.tolist(), building_distances.tolist())
+        )
+        # Сначала лёгкий запрос ключей, строки организаций грузятся только для страницы.
+        # Id зданий передаются одним массивом: IN со своим параметром на каждое здание
+        # упирается в лимит параметров asyncpg и на каждый размер готовит новый запрос
+        organization, _ = cls.__sources()
+        result = await db.execute(
+            cls.__select(organization.id, organization.building_id).where(
+                organization.building_id
+                == func.any(
+                    bindparam(
+                        "building_ids", list(distance_by_building), ARRAY(Integer)
+                    )
+                ),
+                *conditions,
+            )
+        )
+        keys = sorted(
+            (distance_by_building[building_id], org_id)
+            for org_id, building_id in result.tuples().all()
+        )
+        if after:
+            keys = [key for key in keys if key > tuple(after)]
+        return keys
+
+    @classmethod
+    @timed("organization")
     async def get_organizations(
         cls,
         query_params: (
@@ -246,8 +535,7 @@ class OrganizationBusinessService:
     ):
         """
         Точка входа в бизнес логику организаций.
-        В зависимости от query_param вызывает один из приватных методов для поиска организаций
-        по зданию, виду деятельности или имени
+        Гео-запрос отдаёт ближайшие организации, остальные запросы - поиск по фильтрам
         """
         logger.debug("get_organizations called with params: %s", query_params)
         if isinstance(query_params, GetOrganizationsByGeoRequestSchema):
@@ -255,51 +543,103 @@ class OrganizationBusinessService:
                 query_params.current_latitude,
                 query_params.current_longitude,
                 query_params.radius,
+                cls.__search_conditions(query_params),
+                query_params,
                 db,
             )
-        if query_params.building_name:
-            return await cls.__get_organization_by_building(
-                query_params.building_name, db
-            )
-        elif query_params.organization_name:
-            return await cls.__get_organizations_by_name(
-                query_params.organization_name, db
-            )
-        elif query_params.activity_name:
-            return await cls.__get_organizations_by_activity(
-                query_params.activity_name, db
+        return await cls.__search_organizations(query_params, db)
+
+    @classmethod
+    async def get_organizations_in_own_session(
+        cls,
+        query_params: (
+            GetOrganizationsRequestSchema | GetOrganizationsByGeoRequestSchema
+        ),
+    ) -> dict:
+        """
+        get_organizations в своей сессии чтения. Одинаковые одновременные запросы
+        ждут один такой вызов, поэтому он не должен зависеть от сессии и жизни
+        обработчика, который его запустил. При обрыве соединения с репликой
+        чтение повторяется один раз (см. run_in_read_session)
+        """
+        return await run_in_read_session(
+            lambda db: cls.get_organizations(query_params=query_params, db=db)
+        )
+
+    @classmethod
+    async def export_organizations(cls, batch_size: int) -> AsyncIterator[List[dict]]:
+        """
+        Выгружает все организации пачками по batch_size, читая их потоком из курсора БД.
+        Работает в своей сессии, потому что живёт дольше обработчика запроса
+        """
+        logger.info("Exporting organizations in batches of %d", batch_size)
+        organization, _ = cls.__sources()
+        async with read_session() as db:
+            result = await db.stream(
+                cls.__base_query()
+                .order_by(organization.id)
+                .execution_options(yield_per=batch_size)
             )
-        else:
-            return await cls.__get_all_organizations(db)
+            async for rows in result.partitions():
+                activity_trees = await cls.__activity_trees(rows, db)
+                yield [
+                    organization_to_dict(row, activity_trees[row.id]) for row in rows
+                ]
 
     @classmethod
+    @timed("organization")
     async def get_organization_by_id(
         cls, organization_id: int, db: AsyncSession
-    ) -> OrganizationResponseSchema:
+    ) -> dict:
         """
         Позволяет получить организацию по ее id
         """
         logger.info("Fetching organization by id: %s", organization_id)
+        organization, _ = cls.__sources()
         result = await db.execute(
-            select(Organization)
-            .options(
-                selectinload(Organization.building),
-                selectinload(Organization.activities),
+            cls.__base_query().where(organization.id == organization_id)
+        )
+        row = result.first()
+        if row is None:
+            raise exceptions.HTTPException(
+                status_code=404, detail="Организация не найдена"
             )
-            .where(Organization.id == organization_id)
+        activity_trees = await cls.__activity_trees([row], db)
+        return organization_to_dict(row, activity_trees[row.id])
+
+    @classmethod
+    async def get_organization_by_id_in_own_session(cls, organization_id: int) -> dict:
+        """
+        get_organization_by_id в своей сессии чтения: одинаковые одновременные
+        запросы ждут один такой вызов, как и в get_organizations_in_own_session
+        """
+        return await run_in_read_session(
+            lambda db: cls.get_organization_by_id(organization_id, db=db)
         )
-        organization = result.scalars().first()
-        return OrganizationResponseSchema(
-            id=organization.id,
-            name=organization.name,
-            building=BuildingSchema(
-                id=organization.building.id,
-                address=organization.building.address,
-                latitude=organization.building.latitude,
-                longitude=organization.building.longitude,
-            ),
-            activity_tree=await cls.__build_activity_tree_for_org(
-                organization.activities, db
-            ),
-            phone_number=organization.phone,
+
+    @classmethod
+    @timed("organization")
+    async def get_organizations_by_ids(
+        cls, organization_ids: List[int], db: AsyncSession
+    ) -> dict:
+        """
+        Позволяет получить организации по списку id: один запрос IN и одна сборка
+        деревьев активностей на все. Порядок совпадает с запрошенным, повторы убираются,
+        ненайденные id перечисляются в missing_ids
+        """
+        logger.info("Fetching %d organizations by ids", len(organization_ids))
+        requested = list(dict.fromkeys(organization_ids))
+        organization, _ = cls.__sources()
+        result = await db.execute(
+            cls.__base_query().where(organization.id.in_(requested))
         )
+        rows = {row.id: row for row in result.all()}
+        activity_trees = await cls.__activity_trees(list(rows.values()), db)
+        return {
+            "organizations": [
+                organization_to_dict(rows[org_id], activity_trees[org_id])
+                for org_id in requested
+                if org_id in rows
+            ],
+            "missing_ids": [org_id for org_id in requested if org_id not in rows],
+        }
@@ -0,0 +1,120 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+
+from apps.activity.models import Activity, activity_closure
+from apps.organization.models import MAX_ACTIVITY_DEPTH
+
+pytestmark = pytest.mark.anyio
+
+
+async def closure_rows(session) -> set:
+    rows = await session.execute(
+        select(
+            activity_closure.c.ancestor_id,
+            activity_closure.c.descendant_id,
+            activity_closure.c.depth,
+        )
+    )
+    return set(map(tuple, rows.all()))
+
+
+async def expected_closure(session) -> set:
+    """Замыкание, построенное заново по parent_id всех активностей"""
+    parents = dict(
+        (await session.execute(select(Activity.id, Activity.parent_id))).all()
+    )
+    rows = set()
+    for activity_id in parents:
+        ancestor_id, depth = activity_id, 0
+        while ancestor_id is not None:
+            rows.add((ancestor_id, activity_id, depth))
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    return rows
+
+
+async def test_fixture_closure_matches_parents(session_factory):
+    async with session_factory() as session:
+        assert await closure_rows(session) == await expected_closure(session)
+
+
+async def test_insert_adds_paths_from_all_ancestors(session_factory):
+    async with session_factory() as session:
+        activity = Activity(name="Новая", parent_id=2)
+        session.add(activity)
+        await session.commit()
+
+        rows = await closure_rows(session)
+        assert {row for row in rows if row[1] == activity.id} == {
+            (activity.id, activity.id, 0),
+            (2, activity.id, 1),
+            (1, activity.id, 2),
+        }
+        assert rows == await expected_closure(session)
+
+
+async def test_insert_deeper_than_max_is_rejected(session_factory):
+    async with session_factory() as session:
+        # 1 -> 2 -> 3 уже на максимальной глубине
+        session.add(Activity(name="Слишком глубоко", parent_id=3))
+        with pytest.raises(InvalidRequestError, match=str(MAX_ACTIVITY_DEPTH)):
+            await session.flush()
+        await session.rollback()
+
+        assert await closure_rows(session) == await expected_closure(session)
+
+
+async def test_move_rebuilds_subtree_paths(session_factory):
+    async with session_factory() as session:
+        activity = await session.get(Activity, 2)
+        activity.parent_id = 5
+        await session.commit()
+
+        rows = await closure_rows(session)
+        assert (5, 3, 2) in rows and (1, 3, 2) not in rows
+        assert rows == await expected_closure(session)
+
+
+async def test_move_to_root_drops_outer_paths(session_factory):
+    async with session_factory() as session:
+        activity = await session.get(Activity, 2)
+        activity.parent_id = None
+        await session.commit()
+
+        rows = await closure_rows(session)
+        assert not {row for row in rows if row[0] == 1 and row[1] in (2, 3, 4)}
+        assert rows == await expected_closure(session)
+
+
+@pytest.mark.parametrize("activity_id, parent_id", [(1, 3), (1, 2), (2, 2)])
+async def test_move_under_own_descendant_is_rejected(
+    session_factory, activity_id, parent_id
+):
+    async with session_factory() as session:
+        activity = await session.get(Activity, activity_id)
+        activity.parent_id = parent_id
+        with pytest.raises(InvalidRequestError, match="потомком самой себя"):
+            await session.flush()
+        await session.rollback()
+
+        assert await closure_rows(session) == await expected_closure(session)
+
+
+async def test_move_deeper_than_max_is_rejected(session_factory):
+    async with session_factory() as session:
+        # Поддерево 5 -> 6 -> 7 под активностью 1 ушло бы на четвёртый уровень
+        activity = await session.get(Activity, 5)
+        activity.parent_id = 1
+        with pytest.raises(InvalidRequestError, match=str(MAX_ACTIVITY_DEPTH)):
+            await session.flush()
+        await session.rollback()
+
+
+async def test_move_leaf_within_max_depth(session_factory):
+    async with session_factory() as session:
+        activity = await session.get(Activity, 7)
+        activity.parent_id = 2
+        await session.commit()
+
+        assert (1, 7, 2) in await closure_rows(session)
+        assert await closure_rows(session) == await expected_closure(session)
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import update
+
+from apps.activity.hierarchy import activity_hierarchy_cache
+from apps.activity.models import Activity
+
+PREFIX = "/v1/organizations/organization"
+
+pytestmark = pytest.mark.anyio
+
+
+def tree_names(tree: list) -> dict:
+    """Имена активностей дерева по id вместе с id родителя"""
+    names = {}
+
+    def walk(nodes, parent_id):
+        for node in nodes:
+            names[node["id"]] = (node["name"], parent_id)
+            walk(node["children"], node["id"])
+
+    walk(tree, None)
+    return names
+
+
+async def test_hierarchy_is_invalidated_on_commit_not_flush(session_factory):
+    async with session_factory() as session:
+        activity = await session.get(Activity, 1)
+        activity.name = "Переименовано"
+        await session.flush()
+        # Изменение ещё не зафиксировано: параллельный запрос не должен его перечитать
+        assert activity_hierarchy_cache.is_fresh()
+        await session.commit()
+    assert not activity_hierarchy_cache.is_fresh()
+
+
+async def test_rollback_keeps_hierarchy(session_factory):
+    async with session_factory() as session:
+        activity = await session.get(Activity, 1)
+        activity.name = "Отменено"
+        await session.flush()
+        await session.rollback()
+    assert activity_hierarchy_cache.is_fresh()
+
+
+async def test_rename_is_visible_after_commit(session_factory, client):
+    async with session_factory() as session:
+        await session.execute(
+            update(Activity).where(Activity.id == 2).values(name="Новое имя")
+        )
+        await session.commit()
+
+    response = await client.get(PREFIX + "/1")
+    assert tree_names(response.json()["activity_tree"])[2] == ("Новое имя", 1)
+
+
+async def test_move_is_visible_after_commit(session_factory, client):
+    async with session_factory() as session:
+        activity = await session.get(Activity, 3)
+        activity.parent_id = 1
+        await session.commit()
+
+    response = await client.get(PREFIX + "/1")
+    assert tree_names(response.json()["activity_tree"])[3] == ("Ночная экскурсия", 1)
@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import update
+
+from apps.organization.models import Organization
+from utils.pagination import encode_cursor
+
+PREFIX = "/v1/organizations/organization"
+GEO = PREFIX + "/search-by-geo"
+CENTER = {"current_latitude": 55.75, "current_longitude": 37.61}
+
+pytestmark = pytest.mark.anyio
+
+
+async def fetch_all(client, path: str, params: dict) -> list:
+    """Проходит все страницы по next_cursor и возвращает id в порядке выдачи"""
+    ids, cursor, seen = [], None, set()
+    while True:
+        # Повтор курсора - страницы ходят по кругу
+        assert cursor not in seen
+        seen.add(cursor)
+        page_params = dict(params, cursor=cursor) if cursor else params
+        response = await client.get(path, params=page_params)
+        assert response.status_code == 200
+        body = response.json()
+        ids += [organization["id"] for organization in body["organizations"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+async def assert_pages_match_one_page(client, path: str, params: dict):
+    whole = (await client.get(path, params=dict(params, limit=100))).json()
+    expected = [organization["id"] for organization in whole["organizations"]]
+    assert len(expected) > 3
+    for limit in (1, 2, 3):
+        assert await fetch_all(client, path, dict(params, limit=limit)) == expected
+
+
+async def test_pages_by_id(client):
+    await assert_pages_match_one_page(client, PREFIX, {})
+
+
+async def test_pages_by_equal_relevance(client):
+    """Ранги у всех найденных совпадают, порядок и страницы держатся на id"""
+    await assert_pages_match_one_page(
+        client, PREFIX, {"building_name": "ул", "order_by": "relevance"}
+    )
+
+
+async def test_pages_by_mixed_relevance(client):
+    await assert_pages_match_one_page(
+        client, PREFIX, {"activity_name": "а", "order_by": "relevance"}
+    )
+
+
+async def test_geo_pages_with_equal_distances(session_factory, client):
+    # Организации в одном здании находятся на одном расстоянии от центра
+    async with session_factory() as session:
+        await session.execute(
+            update(Organization)
+            .where(Organization.id.in_([2, 3, 4]))
+            .values(building_id=1)
+        )
+        await session.commit()
+
+    await assert_pages_match_one_page(client, GEO, dict(CENTER, radius=100000))
+
+
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        (PREFIX, {}),
+        (PREFIX, {"organization_name": "а", "order_by": "relevance"}),
+        (GEO, dict(CENTER, radius=100000)),
+    ],
+)
+async def test_tampered_cursor_is_rejected(client, path, params):
+    response = await client.get(path, params=dict(params, cursor="bm90IGpzb24"))
+    assert response.status_code == 400
+
+
+async def test_cursor_from_other_order_is_rejected(client):
+    page = (await client.get(PREFIX, params={"limit": 1})).json()
+    response = await client.get(
+        PREFIX,
+        params={
+            "organization_name": "а",
+            "order_by": "relevance",
+            "cursor": page["next_cursor"],
+        },
+    )
+    assert response.status_code == 400
+
+    response = await client.get(
+        PREFIX, params={"limit": 1, "cursor": encode_cursor(1.0, 1)}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+import pytest
+
+from apps.organization.testing import POSTGRES_DOCUMENTS, POSTGRES_TABLES
+from core.settings import get_settings
+from utils.query_stats import assert_max_queries
+
+PREFIX = "/v1/organizations/organization"
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("limit", [1, 50])
+async def test_list_queries_do_not_grow_with_page(client, limit):
+    with assert_max_queries(2):
+        response = await client.get(PREFIX, params={"limit": limit})
+    assert response.status_code == 200
+    assert len(response.json()["organizations"]) == min(limit, 20)
+
+
+async def test_list_with_filters_queries(client):
+    with assert_max_queries(2):
+        response = await client.get(
+            PREFIX,
+            params={
+                "activity_name": "Еда",
+                "current_latitude": 55.75,
+                "current_longitude": 37.61,
+                "radius": 50000,
+            },
+        )
+    assert response.status_code == 200
+    assert response.json()["organizations"]
+
+
+async def test_geo_queries(client):
+    with assert_max_queries(2):
+        response = await client.get(
+            PREFIX + "/search-by-geo",
+            params={
+                "current_latitude": 55.75,
+                "current_longitude": 37.61,
+                "radius": 5000,
+            },
+        )
+    assert response.status_code == 200
+    assert response.json()["organizations"]
+
+
+async def test_by_id_queries(client):
+    with assert_max_queries(2):
+        response = await client.get(PREFIX + "/1")
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+
+
+async def test_batch_queries_do_not_grow_with_ids(client):
+    ids = list(range(1, 21)) + [999]
+    with assert_max_queries(2):
+        response = await client.post(PREFIX + "/batch", json={"ids": ids})
+    assert response.status_code == 200
+    body = response.json()
+    assert [organization["id"] for organization in body["organizations"]] == ids[:-1]
+    assert body["missing_ids"] == [999]
+
+
+@pytest.mark.parametrize(
+    "backend", [POSTGRES_TABLES, POSTGRES_DOCUMENTS], indirect=True
+)
+async def test_in_memory_geo_matches_db_geo(client, monkeypatch):
+    """Весь город в радиусе: id зданий уходят в запрос одним массивом"""
+    params = {"current_latitude": 55.75, "current_longitude": 37.61, "radius": 100000}
+    in_db = await client.get(PREFIX + "/search-by-geo", params=params)
+    monkeypatch.setattr(get_settings(), "GEO_SEARCH_ENGINE", "numpy")
+    with assert_max_queries(3):
+        in_memory = await client.get(PREFIX + "/search-by-geo", params=params)
+    assert in_memory.status_code == in_db.status_code == 200
+    assert in_memory.json() == in_db.json()
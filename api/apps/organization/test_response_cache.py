@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import update
+
+from apps.organization.cache import organization_response_cache
+from apps.organization.models import Organization
+from utils.cache import LRUCache
+from utils.query_stats import assert_max_queries
+
+PREFIX = "/v1/organizations/organization"
+
+pytestmark = pytest.mark.anyio
+
+CACHED_REQUESTS = [
+    (PREFIX, {}),
+    (PREFIX + "/1", {}),
+    (
+        PREFIX + "/search-by-geo",
+        {"current_latitude": 55.75, "current_longitude": 37.61, "radius": 5000},
+    ),
+]
+
+
+@pytest.fixture
+def cached_client(client, monkeypatch):
+    """Клиент с настоящим кэшем ответов вместо NullCache"""
+    monkeypatch.setattr(organization_response_cache, "backend", LRUCache(100, 60))
+    return client
+
+
+async def rename_organization(session_factory, name: str):
+    async with session_factory() as session:
+        await session.execute(
+            update(Organization).where(Organization.id == 1).values(name=name)
+        )
+        await session.commit()
+
+
+@pytest.mark.parametrize("path, params", CACHED_REQUESTS)
+async def test_matching_etag_returns_304_without_queries(cached_client, path, params):
+    first = await cached_client.get(path, params=params)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    with assert_max_queries(0):
+        cached = await cached_client.get(path, params=params)
+        not_modified = await cached_client.get(
+            path, params=params, headers={"If-None-Match": etag}
+        )
+    assert cached.status_code == 200
+    assert cached.content == first.content
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+
+async def test_other_etag_returns_body(cached_client):
+    response = await cached_client.get(
+        PREFIX + "/1", headers={"If-None-Match": '"stale"'}
+    )
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+
+
+async def test_write_changes_etag(session_factory, cached_client):
+    first = await cached_client.get(PREFIX + "/1")
+    etag = first.headers["ETag"]
+
+    await rename_organization(session_factory, "Новое имя")
+
+    response = await cached_client.get(PREFIX + "/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["name"] == "Новое имя"
+
+
+async def test_rolled_back_write_keeps_etag(session_factory, cached_client):
+    etag = (await cached_client.get(PREFIX + "/1")).headers["ETag"]
+
+    async with session_factory() as session:
+        await session.execute(
+            update(Organization).where(Organization.id == 1).values(name="Отменено")
+        )
+        await session.rollback()
+
+    with assert_max_queries(0):
+        response = await cached_client.get(
+            PREFIX + "/1", headers={"If-None-Match": etag}
+        )
+    assert response.status_code == 304
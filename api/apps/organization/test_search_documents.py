@@ -0,0 +1,173 @@
+import json
+
+import pytest
+from sqlalchemy import delete, select, text, update
+
+import bulk_import
+from apps.activity.models import Activity
+from apps.building.models import Building
+from apps.organization.testing import POSTGRES_DOCUMENTS, TABLES
+from apps.organization.models import (
+    Organization,
+    OrganizationSearchDocument,
+    organization_activities,
+)
+from core.settings import get_settings
+
+PREFIX = "/v1/organizations/organization"
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.parametrize("backend", [POSTGRES_DOCUMENTS], indirect=True),
+]
+
+REQUESTS = [
+    ("get", PREFIX, {}),
+    ("get", PREFIX, {"params": {"activity_name": "Еда"}}),
+    ("get", PREFIX, {"params": {"organization_name": "магазин"}}),
+    ("get", PREFIX, {"params": {"building_name": "площадь", "limit": 3}}),
+    (
+        "get",
+        PREFIX + "/search-by-geo",
+        {
+            "params": {
+                "current_latitude": 55.75,
+                "current_longitude": 37.61,
+                "radius": 5000,
+            }
+        },
+    ),
+    (
+        "get",
+        PREFIX + "/search-by-geo",
+        {"params": {"current_latitude": 55.75, "current_longitude": 37.61}},
+    ),
+    ("get", PREFIX + "/1", {}),
+    ("post", PREFIX + "/batch", {"json": {"ids": [3, 1, 999, 2]}}),
+]
+
+
+async def fetch_in_both_models(client, monkeypatch, method, path, kwargs):
+    """Один и тот же запрос через документы поиска и через исходные таблицы"""
+    documents = await getattr(client, method)(path, **kwargs)
+    with monkeypatch.context() as patch:
+        patch.setattr(get_settings(), "ORGANIZATION_READ_MODEL", TABLES)
+        tables = await getattr(client, method)(path, **kwargs)
+    assert documents.status_code == tables.status_code == 200
+    return documents.json(), tables.json()
+
+
+@pytest.mark.parametrize("method, path, kwargs", REQUESTS)
+async def test_documents_match_tables(client, monkeypatch, method, path, kwargs):
+    documents, tables = await fetch_in_both_models(
+        client, monkeypatch, method, path, kwargs
+    )
+    assert documents == tables
+
+
+async def test_triggers_refresh_documents_on_writes(
+    session_factory, client, monkeypatch
+):
+    async with session_factory() as session:
+        await session.execute(
+            update(Organization).where(Organization.id == 1).values(name="Новое имя")
+        )
+        await session.execute(
+            update(Building).where(Building.id == 1).values(address="Новый адрес")
+        )
+        await session.execute(
+            update(Activity).where(Activity.id == 1).values(name="Новая активность")
+        )
+        await session.execute(
+            organization_activities.insert().values(organization_id=1, activity_id=5)
+        )
+        await session.commit()
+
+    documents, tables = await fetch_in_both_models(
+        client, monkeypatch, "get", PREFIX + "/1", {}
+    )
+    assert documents == tables
+    assert documents["name"] == "Новое имя"
+    assert documents["building"]["address"] == "Новый адрес"
+    assert documents["activity_tree"][0]["name"] == "Новая активность"
+
+
+async def test_moving_activity_refreshes_documents(
+    session_factory, client, monkeypatch
+):
+    async with session_factory() as session:
+        activity = await session.get(Activity, 3)
+        activity.parent_id = 1
+        await session.commit()
+
+    documents, tables = await fetch_in_both_models(
+        client, monkeypatch, "get", PREFIX + "/1", {}
+    )
+    assert documents == tables
+
+
+async def test_unlinking_activity_removes_organization_from_filter(
+    session_factory, client, monkeypatch
+):
+    params = {"params": {"activity_name": "1"}}
+    documents, _ = await fetch_in_both_models(
+        client, monkeypatch, "get", PREFIX, params
+    )
+    assert 1 in [organization["id"] for organization in documents["organizations"]]
+
+    async with session_factory() as session:
+        await session.execute(
+            delete(organization_activities).where(
+                organization_activities.c.organization_id == 1
+            )
+        )
+        await session.commit()
+
+    documents, tables = await fetch_in_both_models(
+        client, monkeypatch, "get", PREFIX, params
+    )
+    assert documents == tables
+    assert 1 not in [organization["id"] for organization in documents["organizations"]]
+
+
+async def test_deferred_refresh_waits_for_explicit_rebuild(session_factory):
+    async with session_factory() as session:
+        await session.execute(text("SET LOCAL organization_search.deferred = on"))
+        await session.execute(
+            update(Organization).where(Organization.id == 1).values(name="Отложено")
+        )
+        stale = await session.scalar(
+            select(OrganizationSearchDocument.name).where(
+                OrganizationSearchDocument.id == 1
+            )
+        )
+        assert stale != "Отложено"
+
+        await session.execute(
+            text("SELECT refresh_organization_search_documents(NULL)")
+        )
+        fresh = await session.scalar(
+            select(OrganizationSearchDocument.name).where(
+                OrganizationSearchDocument.id == 1
+            )
+        )
+        assert fresh == "Отложено"
+        await session.rollback()
+
+
+async def test_bulk_import_rebuilds_documents(client, monkeypatch, tmp_path):
+    organizations = tmp_path / "organizations.json"
+    organizations.write_text(
+        json.dumps([{"id": 1, "name": "Импорт", "building_id": 2, "phone": "+7999"}]),
+        encoding="utf-8",
+    )
+    await bulk_import.import_data(
+        {"organizations": str(organizations)}, bulk_import.UPSERT
+    )
+
+    documents, tables = await fetch_in_both_models(
+        client, monkeypatch, "get", PREFIX + "/1", {}
+    )
+    assert documents == tables
+    assert documents["name"] == "Импорт"
+    assert documents["building"]["id"] == 2
@@ -0,0 +1,23 @@
+"""Варианты БД и модели чтения, на которых идут тесты организаций"""
+
+import os
+
+import pytest
+
+SQLITE = "sqlite"
+POSTGRES = "postgres"
+TABLES = "tables"
+DOCUMENTS = "documents"
+
+# Документы поиска, их триггеры и функции пересборки есть только в Postgres:
+# такие тесты идут на пустой БД из TEST_POSTGRES_URL (см. api/conftest.py)
+requires_postgres = pytest.mark.skipif(
+    not os.environ.get("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set"
+)
+SQLITE_TABLES = pytest.param((SQLITE, TABLES), id="sqlite-tables")
+POSTGRES_TABLES = pytest.param(
+    (POSTGRES, TABLES), id="postgres-tables", marks=requires_postgres
+)
+POSTGRES_DOCUMENTS = pytest.param(
+    (POSTGRES, DOCUMENTS), id="postgres-documents", marks=requires_postgres
+)
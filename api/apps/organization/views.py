@@ -1,32 +1,46 @@
-from fastapi import APIRouter, Depends, Request
-from utils.db import get_session
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from utils.db import get_read_session
 from utils.auth import authenticate
 from .schemas import (
     GetOrganizationListResponseSchema,
+    GetOrganizationsByIdsRequestSchema,
+    GetOrganizationsByIdsResponseSchema,
     GetOrganizationsRequestSchema,
     OrganizationResponseSchema,
     GetOrganizationsByGeoRequestSchema,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
+from apps.organization.cache import build_cache_key, organization_response_cache
 from apps.organization.services.busines import OrganizationBusinessService
+from core.settings import get_settings
 from utils.logger import get_logger
+from utils.streaming import gzip_stream, ndjson_stream
 
 router = APIRouter()
+export_router = APIRouter()
 logger = get_logger(__name__)
+settings = get_settings()
 
 
 @router.get("", response_model=GetOrganizationListResponseSchema)
 async def get_organization_list(
     request: Request,
     query_params: GetOrganizationsRequestSchema = Depends(),
-    db: AsyncSession = Depends(get_session),
 ):
     """
-    В зависимости от переданных параметров возвращает список организаций, при их отсутствии возвразает все организации.
+    Возвращает организации, подходящие под все переданные фильтры: имя, здание,
+    вид деятельности (вместе с подвидами) и круг на карте. Без фильтров возвращает все организации.
     """
     logger.debug("HTTP get_organization_list called with params: %s", query_params)
-    return await OrganizationBusinessService.get_organizations(
-        query_params=query_params, db=db
+    query_params = query_params.normalized()
+    return await organization_response_cache.respond(
+        request,
+        build_cache_key("list", query_params.model_dump()),
+        # Одинаковые одновременные запросы ждут одно вычисление в его собственной сессии
+        lambda: OrganizationBusinessService.get_organizations_in_own_session(
+            query_params
+        ),
     )
 
 
@@ -34,10 +48,11 @@ async def get_organization_list(
 async def search_organizations_by_geo(
     request: Request,
     query_params: GetOrganizationsByGeoRequestSchema = Depends(),
-    db: AsyncSession = Depends(get_session),
 ):
     """
-    Позволяет искать организации по геолокации (широта и долгота)
+    Позволяет искать организации по геолокации (широта и долгота), ближайшие первыми.
+    Без radius возвращает limit ближайших организаций, activity_name оставляет
+    только организации с этим видом деятельности
     """
     logger.debug(
         "HTTP search_organizations_by_geo called with coords: (%s, %s) and radius: %s",
@@ -45,20 +60,72 @@ async def search_organizations_by_geo(
         query_params.current_longitude,
         query_params.radius,
     )
-    return await OrganizationBusinessService.get_organizations(
-        db=db, query_params=query_params
+    query_params = query_params.normalized()
+    if settings.RESPONSE_CACHE_GEO_GRID > 0:
+        query_params = query_params.snapped(settings.RESPONSE_CACHE_GEO_GRID)
+    return await organization_response_cache.respond(
+        request,
+        build_cache_key("geo", query_params.model_dump()),
+        lambda: OrganizationBusinessService.get_organizations_in_own_session(
+            query_params
+        ),
+    )
+
+
+@router.post("/batch", response_model=GetOrganizationsByIdsResponseSchema)
+async def get_organizations_by_ids(
+    body: GetOrganizationsByIdsRequestSchema,
+    db: AsyncSession = Depends(get_read_session),
+):
+    """
+    Позволяет получить до 500 организаций по списку id за один запрос.
+    Организации идут в порядке запроса, ненайденные id перечислены в missing_ids
+    """
+    logger.debug("HTTP get_organizations_by_ids called with %d ids", len(body.ids))
+    # Ответ собран сервисом, повторная валидация FastAPI не нужна
+    return ORJSONResponse(
+        await OrganizationBusinessService.get_organizations_by_ids(body.ids, db=db)
     )
 
 
 @router.get("/{organization_id}", response_model=OrganizationResponseSchema)
 async def get_organization_by_id(
+    request: Request,
     organization_id: int,
-    db: AsyncSession = Depends(get_session),
 ):
     """
     Позволяет получить организацию по ее id
     """
     logger.debug("HTTP get_organization_by_id called with id: %s", organization_id)
-    return await OrganizationBusinessService.get_organization_by_id(
-        organization_id, db=db
+    return await organization_response_cache.respond(
+        request,
+        build_cache_key("by_id", {"organization_id": organization_id}),
+        lambda: OrganizationBusinessService.get_organization_by_id_in_own_session(
+            organization_id
+        ),
+    )
+
+
+@export_router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def export_organizations(
+    gzip: bool = Query(False, description="Сжать выгрузку в gzip"),
+):
+    """
+    Выгружает все организации в формате NDJSON: одна организация в форме
+    OrganizationResponseSchema на строку. Ответ отдаётся потоком
+    """
+    logger.debug("HTTP export_organizations called, gzip: %s", gzip)
+    content = ndjson_stream(
+        OrganizationBusinessService.export_organizations(settings.EXPORT_BATCH_SIZE)
+    )
+    headers = {}
+    if gzip:
+        content = gzip_stream(content)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        content, media_type="application/x-ndjson", headers=headers
     )
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import HTTPBearer
 from core.settings import get_settings
 from apps.organization.router import organizations_router
+from apps.internal.router import internal_router
+from apps.internal.views import health_router, metrics_router
 
 settings = get_settings()
 
@@ -19,3 +21,10 @@ class SuperHttpBearer(HTTPBearer):
 security = SuperHttpBearer()
 router = APIRouter()
 router.include_router(organizations_router, dependencies=[Depends(security)])
+router.include_router(internal_router, dependencies=[Depends(security)])
+
+# /metrics отдаётся от корня, как его ожидает Prometheus
+root_router = APIRouter()
+root_router.include_router(metrics_router, dependencies=[Depends(security)])
+# Пробы оркестратора ходят без ключа
+root_router.include_router(health_router)
@@ -0,0 +1,175 @@
+"""
+Генератор синтетического справочника для нагрузочных тестов.
+
+Пишет в каталог файлы buildings.ndjson, activities.ndjson, organizations.ndjson
+и organization_activities.ndjson, которые загружаются командой bulk_import:
+    PYTHONPATH=api python -m benchmarks.generate_dataset --buildings 100000 --out ./dataset
+    python api/bulk_import.py --dir ./dataset --mode full
+
+Здания группируются вокруг нескольких городских центров, у каждого здания
+в среднем --organizations-per-building организаций. Деревья видов деятельности
+не глубже MAX_ACTIVITY_DEPTH
+"""
+
+import argparse
+import logging
+import os
+import random
+import time
+from typing import Iterator, List, Tuple
+
+import orjson
+from faker import Faker
+
+from apps.organization.models import MAX_ACTIVITY_DEPTH
+
+# (широта, долгота, разброс в градусах, вес)
+CITY_CENTERS = (
+    (55.7558, 37.6173, 0.12, 0.45),
+    (59.9343, 30.3351, 0.10, 0.2),
+    (55.0084, 82.9357, 0.08, 0.1),
+    (56.8389, 60.6057, 0.07, 0.1),
+    (55.7887, 49.1221, 0.06, 0.08),
+    (43.5855, 39.7231, 0.05, 0.07),
+)
+
+
+def generate_buildings(count: int, fake: Faker, rnd: random.Random) -> Iterator[dict]:
+    weights = [center[3] for center in CITY_CENTERS]
+    for building_id in range(1, count + 1):
+        latitude, longitude, spread, _ = rnd.choices(CITY_CENTERS, weights)[0]
+        yield {
+            "id": building_id,
+            "address": fake.street_address(),
+            "latitude": round(rnd.gauss(latitude, spread), 6),
+            "longitude": round(rnd.gauss(longitude, spread * 1.6), 6),
+        }
+
+
+def generate_activities(
+    roots: int, branching: int, fake: Faker, rnd: random.Random
+) -> Tuple[List[dict], List[int]]:
+    """
+    Лес видов деятельности глубиной MAX_ACTIVITY_DEPTH: у каждого узла
+    от 1 до branching детей. Возвращает активности и id листьев
+    """
+    activities: List[dict] = []
+    level = []
+    for _ in range(roots):
+        activity_id = len(activities) + 1
+        activities.append(
+            {"id": activity_id, "name": fake.bs().capitalize(), "parent_id": None}
+        )
+        level.append(activity_id)
+    for _ in range(MAX_ACTIVITY_DEPTH - 1):
+        next_level = []
+        for parent_id in level:
+            for _ in range(rnd.randint(1, branching)):
+                activity_id = len(activities) + 1
+                activities.append(
+                    {
+                        "id": activity_id,
+                        "name": fake.catch_phrase(),
+                        "parent_id": parent_id,
+                    }
+                )
+                next_level.append(activity_id)
+        level = next_level
+    return activities, level
+
+
+def generate_organizations(
+    buildings: int,
+    per_building: float,
+    activity_ids: List[int],
+    leaves: List[int],
+    fake: Faker,
+    rnd: random.Random,
+) -> Iterator[Tuple[dict, List[dict]]]:
+    """Организации со ссылками на здания и 1-3 видами деятельности, чаще листовыми"""
+    count = int(buildings * per_building)
+    for organization_id in range(1, count + 1):
+        organization = {
+            "id": organization_id,
+            "name": fake.company(),
+            "building_id": rnd.randint(1, buildings),
+            "phone": f"+7{rnd.randint(9000000000, 9999999999)}",
+        }
+        linked = set()
+        for _ in range(rnd.randint(1, 3)):
+            linked.add(
+                rnd.choice(leaves) if rnd.random() < 0.8 else rnd.choice(activity_ids)
+            )
+        links = [
+            {"organization_id": organization_id, "activity_id": activity_id}
+            for activity_id in sorted(linked)
+        ]
+        yield organization, links
+
+
+def _write(path: str, rows) -> int:
+    count = 0
+    with open(path, "wb") as f:
+        for row in rows:
+            f.write(orjson.dumps(row) + b"\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--out", default="./dataset")
+    parser.add_argument("--buildings", type=int, default=100_000)
+    parser.add_argument("--organizations-per-building", type=float, default=1.5)
+    parser.add_argument("--activity-roots", type=int, default=30)
+    parser.add_argument("--activity-branching", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--locale", default="ru_RU")
+    args = parser.parse_args()
+
+    logging.getLogger("faker").setLevel(logging.WARNING)
+    rnd = random.Random(args.seed)
+    fake = Faker(args.locale)
+    fake.seed_instance(args.seed)
+    os.makedirs(args.out, exist_ok=True)
+    started = time.perf_counter()
+
+    count = _write(
+        os.path.join(args.out, "buildings.ndjson"),
+        generate_buildings(args.buildings, fake, rnd),
+    )
+    print(f"buildings: {count}")
+
+    activities, leaves = generate_activities(
+        args.activity_roots, args.activity_branching, fake, rnd
+    )
+    count = _write(os.path.join(args.out, "activities.ndjson"), activities)
+    print(f"activities: {count} ({len(leaves)} leaves)")
+
+    activity_ids = [activity["id"] for activity in activities]
+    organizations = 0
+    links = 0
+    with open(os.path.join(args.out, "organizations.ndjson"), "wb") as orgs, open(
+        os.path.join(args.out, "organization_activities.ndjson"), "wb"
+    ) as org_links:
+        for organization, organization_links in generate_organizations(
+            args.buildings,
+            args.organizations_per_building,
+            activity_ids,
+            leaves,
+            fake,
+            rnd,
+        ):
+            orgs.write(orjson.dumps(organization) + b"\n")
+            organizations += 1
+            for link in organization_links:
+                org_links.write(orjson.dumps(link) + b"\n")
+                links += 1
+    print(f"organizations: {organizations}, organization_activities: {links}")
+    print(f"generated in {time.perf_counter() - started:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Сравнение векторного гео-движка с текущим циклом по geopy.
+
+Запуск из корня репозитория:
+    PYTHONPATH=api python -m benchmarks.geo_search --sizes 10000 100000 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+
+from apps.building.geo_engine import BuildingGeoIndex
+
+CENTER = (55.7500, 37.6100)
+
+
+def _generate(size: int, seed: int):
+    rng = np.random.default_rng(seed)
+    latitudes = CENTER[0] + rng.normal(scale=0.2, size=size)
+    longitudes = CENTER[1] + rng.normal(scale=0.35, size=size)
+    return np.arange(1, size + 1), latitudes, longitudes
+
+
+def _geopy_loop(latitudes, longitudes, radius: float) -> int:
+    found = 0
+    for latitude, longitude in zip(latitudes.tolist(), longitudes.tolist()):
+        if geodesic(CENTER, (latitude, longitude)).meters <= radius:
+            found += 1
+    return found
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--radius", type=float, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(
+        f"{'buildings':>10} {'geopy, s':>10} {'numpy, ms':>10} "
+        f"{'refined, ms':>12} {'speedup':>9} {'found':>7}"
+    )
+    for size in args.sizes:
+        ids, latitudes, longitudes = _generate(size, args.seed)
+        index = BuildingGeoIndex(ids, latitudes, longitudes)
+
+        expected, geopy_time = _timed(_geopy_loop, latitudes, longitudes, args.radius)
+        plain_time = min(
+            _timed(index.within_radius, *CENTER, args.radius, False)[1]
+            for _ in range(args.repeat)
+        )
+        refined_time = min(
+            _timed(index.within_radius, *CENTER, args.radius)[1]
+            for _ in range(args.repeat)
+        )
+        found, _ = index.within_radius(*CENTER, args.radius)
+        assert len(found) == expected, (len(found), expected)
+
+        print(
+            f"{size:>10} {geopy_time:>10.2f} {plain_time * 1000:>10.2f} "
+            f"{refined_time * 1000:>12.2f} {geopy_time / refined_time:>8.0f}x "
+            f"{expected:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
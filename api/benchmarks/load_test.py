@@ -0,0 +1,312 @@
+"""
+Нагрузочный тест эндпоинтов организаций против запущенного приложения и локального Postgres.
+
+Каждый сценарий (list, name, building, activity, geo, nearest, by_id) прогоняется отдельно
+с заданной конкурентностью, параметры запросов берутся из случайной выборки данных БД.
+Для каждого сценария считаются p50/p95/p99, RPS и число запросов к БД на HTTP-запрос
+(из заголовка Server-Timing, который ставит QueryStatsMiddleware). Если в БД включён
+pg_stat_statements, дополнительно пишется прирост calls за прогон: это число по всему серверу,
+вместе с фоновыми задачами и чужими клиентами, а не по запросам теста.
+Результаты сохраняются в JSON и могут сравниваться с прошлым прогоном.
+
+Запуск из корня репозитория:
+    PYTHONPATH=api python -m benchmarks.load_test --concurrency 16 --requests 2000
+    PYTHONPATH=api python -m benchmarks.load_test --compare benchmark_results/<прошлый>.json
+
+Чтобы измерять сервис, а не кэш ответов, приложение запускается с RESPONSE_CACHE_BACKEND=none
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import asyncpg
+import httpx
+
+from core.settings import get_settings
+
+SCENARIOS = ("list", "name", "building", "activity", "geo", "nearest", "by_id")
+BASE_PATH = "/v1/organizations/organization"
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+async def load_samples(conn: asyncpg.Connection, size: int) -> Dict[str, list]:
+    """Случайные поисковые термины, координаты и id из текущих данных"""
+
+    def longest_word(text: str) -> str:
+        return max(text.replace(",", " ").split(), key=len)
+
+    organizations = await conn.fetch(
+        "SELECT id, name FROM organizations ORDER BY random() LIMIT $1", size
+    )
+    buildings = await conn.fetch(
+        "SELECT address, latitude, longitude FROM buildings ORDER BY random() LIMIT $1",
+        size,
+    )
+    activities = await conn.fetch(
+        "SELECT name FROM activities ORDER BY random() LIMIT $1", size
+    )
+    if not (organizations and buildings and activities):
+        raise SystemExit("В БД нет данных, сначала загрузите справочник")
+    return {
+        "ids": [row["id"] for row in organizations],
+        "names": [longest_word(row["name"]) for row in organizations],
+        "addresses": [longest_word(row["address"]) for row in buildings],
+        "activities": [longest_word(row["name"]) for row in activities],
+        "points": [(row["latitude"], row["longitude"]) for row in buildings],
+    }
+
+
+def build_request(
+    scenario: str, samples: Dict[str, list], rnd: random.Random, radius: int
+) -> Tuple[str, dict]:
+    if scenario == "list":
+        return BASE_PATH, {}
+    if scenario == "name":
+        return BASE_PATH, {"organization_name": rnd.choice(samples["names"])}
+    if scenario == "building":
+        return BASE_PATH, {"building_name": rnd.choice(samples["addresses"])}
+    if scenario == "activity":
+        return BASE_PATH, {"activity_name": rnd.choice(samples["activities"])}
+    if scenario == "geo":
+        latitude, longitude = rnd.choice(samples["points"])
+        return f"{BASE_PATH}/search-by-geo", {
+            "current_latitude": latitude,
+            "current_longitude": longitude,
+            "radius": radius,
+        }
+    if scenario == "nearest":
+        latitude, longitude = rnd.choice(samples["points"])
+        return f"{BASE_PATH}/search-by-geo", {
+            "current_latitude": latitude,
+            "current_longitude": longitude,
+            "limit": 20,
+        }
+    return f"{BASE_PATH}/{rnd.choice(samples['ids'])}", {}
+
+
+def response_queries(response: httpx.Response) -> int | None:
+    """Число запросов к БД, выполненных при обработке ответа, из заголовка Server-Timing"""
+    match = SERVER_TIMING_QUERIES.search(response.headers.get("Server-Timing", ""))
+    return int(match.group(1)) if match else None
+
+
+async def count_server_queries(conn: asyncpg.Connection) -> int | None:
+    """
+    Суммарное число запросов к текущей БД по pg_stat_statements.
+    Учитывает все соединения сервера, а не только запросы нагрузочного теста
+    """
+    try:
+        return await conn.fetchval(
+            "SELECT COALESCE(SUM(calls), 0) FROM pg_stat_statements "
+            "WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())"
+        )
+    except asyncpg.PostgresError:
+        return None
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: str,
+    samples: Dict[str, list],
+    requests: int,
+    concurrency: int,
+    radius: int,
+    seed: int,
+) -> Tuple[List[float], List[int], int, float]:
+    """
+    Возвращает задержки успешных запросов в секундах, число запросов к БД
+    по каждому успешному ответу с Server-Timing, число ошибок и общее время
+    """
+    rnd = random.Random(seed)
+    plan = [build_request(scenario, samples, rnd, radius) for _ in range(requests)]
+    latencies: List[float] = []
+    queries: List[int] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while plan:
+            path, params = plan.pop()
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+                count = response_queries(response)
+                if count is not None:
+                    queries.append(count)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, queries, errors, time.perf_counter() - started
+
+
+def summarize(
+    latencies: List[float],
+    queries: List[int],
+    errors: int,
+    elapsed: float,
+    server_queries: int | None,
+) -> dict:
+    total = len(latencies) + errors
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100)
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+        "queries_per_request": (
+            round(statistics.fmean(queries), 2) if queries else None
+        ),
+        "max_queries_per_request": max(queries) if queries else None,
+        # Прирост pg_stat_statements по всему серверу за прогон, не делится на запросы теста
+        "server_wide_queries": server_queries,
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict, baseline: dict | None):
+    header = (
+        f"{'scenario':>10} {'rps':>8} {'p50, ms':>9} {'p95, ms':>9} "
+        f"{'p99, ms':>9} {'q/req':>6} {'q max':>6} {'errors':>7}"
+    )
+    if baseline:
+        header += f" {'rps Δ':>8} {'p95 Δ':>8}"
+    print(header)
+    for scenario, stats in results["scenarios"].items():
+        queries = stats["queries_per_request"]
+        max_queries = stats["max_queries_per_request"]
+        line = (
+            f"{scenario:>10} {stats['rps']:>8.1f} {stats['p50_ms']:>9.2f} "
+            f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+            f"{'-' if queries is None else f'{queries:.1f}':>6} "
+            f"{'-' if max_queries is None else max_queries:>6} {stats['errors']:>7}"
+        )
+        previous = (baseline or {}).get("scenarios", {}).get(scenario)
+        if previous and previous["rps"] and previous["p95_ms"]:
+            rps_delta = (stats["rps"] / previous["rps"] - 1) * 100
+            p95_delta = (stats["p95_ms"] / previous["p95_ms"] - 1) * 100
+            line += f" {rps_delta:>+7.1f}% {p95_delta:>+7.1f}%"
+        print(line)
+
+
+async def run(args) -> dict:
+    settings = get_settings()
+    dsn = settings.POSTGRES_URL.replace("postgresql+asyncpg://", "postgresql://")
+    conn = await asyncpg.connect(dsn)
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "scenarios": {},
+    }
+    try:
+        samples = await load_samples(conn, args.samples)
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=args.url,
+            headers={"Authorization": f"Bearer {settings.STATIC_API_KEY}"},
+            limits=limits,
+            timeout=args.timeout,
+        ) as client:
+            for scenario in args.scenarios:
+                await run_scenario(
+                    client,
+                    scenario,
+                    samples,
+                    args.warmup,
+                    args.concurrency,
+                    args.radius,
+                    0,
+                )
+                before = await count_server_queries(conn)
+                latencies, queries, errors, elapsed = await run_scenario(
+                    client,
+                    scenario,
+                    samples,
+                    args.requests,
+                    args.concurrency,
+                    args.radius,
+                    args.seed,
+                )
+                after = await count_server_queries(conn)
+                # Сам запрос к pg_stat_statements тоже попадает в статистику
+                server_queries = None if before is None else after - before - 1
+                results["scenarios"][scenario] = summarize(
+                    latencies, queries, errors, elapsed, server_queries
+                )
+    finally:
+        await conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--radius", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output-dir", default="./benchmark_results")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(
+        args.output_dir,
+        f"load_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Сериализация больших списков организаций: путь FastAPI с response_model,
+одна сборка pydantic-схем с model_dump_json и словари из строк запроса через orjson.
+БД не нужна, строки и деревья активностей генерируются в памяти.
+
+Запуск из корня репозитория:
+    PYTHONPATH=api python -m benchmarks.serialization --sizes 1000 10000 50000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import namedtuple
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from apps.organization.schemas import (
+    BuildingSchema,
+    GetOrganizationListResponseSchema,
+    OrganizationResponseSchema,
+)
+from apps.organization.serializers import organization_to_dict
+
+OrganizationRow = namedtuple(
+    "OrganizationRow",
+    "id name phone building_id address latitude longitude",
+)
+
+RESPONSE_FIELD = create_model_field(
+    name="Response_organizations",
+    type_=GetOrganizationListResponseSchema,
+    mode="serialization",
+)
+
+
+def _generate(size: int, seed: int):
+    rnd = random.Random(seed)
+    rows = [
+        OrganizationRow(
+            i,
+            f"Организация {i}",
+            f"8-800-{i % 1000:03d}",
+            i % 500 + 1,
+            f"ул. Тестовая, {i % 500 + 1}",
+            55.75 + rnd.uniform(-0.3, 0.3),
+            37.61 + rnd.uniform(-0.5, 0.5),
+        )
+        for i in range(1, size + 1)
+    ]
+    trees = {
+        row.id: [
+            {
+                "id": 1,
+                "name": "Еда",
+                "children": [
+                    {"id": 2, "name": "Мясная продукция", "children": []},
+                    {"id": 3, "name": "Молочная продукция", "children": []},
+                ],
+            }
+        ]
+        for row in rows
+    }
+    return rows, trees
+
+
+def _schemas(rows, trees) -> GetOrganizationListResponseSchema:
+    return GetOrganizationListResponseSchema(
+        organizations=[
+            OrganizationResponseSchema(
+                id=row.id,
+                name=row.name,
+                building=BuildingSchema(
+                    id=row.building_id,
+                    address=row.address,
+                    latitude=row.latitude,
+                    longitude=row.longitude,
+                ),
+                activity_tree=trees[row.id],
+                phone_number=row.phone,
+            )
+            for row in rows
+        ]
+    )
+
+
+def _fastapi_path(rows, trees) -> bytes:
+    """Схемы из сервиса, повторная валидация по response_model и json.dumps"""
+    content = asyncio.run(
+        serialize_response(field=RESPONSE_FIELD, response_content=_schemas(rows, trees))
+    )
+    return JSONResponse(content).body
+
+
+def _pydantic_path(rows, trees) -> bytes:
+    """Схемы из сервиса и model_dump_json без повторной валидации"""
+    return _schemas(rows, trees).model_dump_json().encode()
+
+
+def _dict_path(rows, trees) -> bytes:
+    """Словари прямо из строк и orjson"""
+    return orjson.dumps(
+        {
+            "organizations": [organization_to_dict(row, trees[row.id]) for row in rows],
+            "next_cursor": None,
+        }
+    )
+
+
+def _best_of(fn, rows, trees, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(rows, trees)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    paths = (
+        ("fastapi", _fastapi_path),
+        ("pydantic", _pydantic_path),
+        ("orjson", _dict_path),
+    )
+    print(
+        f"{'rows':>8} {'fastapi, ms':>12} {'pydantic, ms':>13} "
+        f"{'orjson, ms':>11} {'speedup':>8}"
+    )
+    for size in args.sizes:
+        rows, trees = _generate(size, args.seed)
+        assert orjson.loads(_dict_path(rows, trees)) == orjson.loads(
+            _fastapi_path(rows, trees)
+        )
+        timings = {name: _best_of(fn, rows, trees, args.repeat) for name, fn in paths}
+        print(
+            f"{size:>8} {timings['fastapi'] * 1000:>12.1f} "
+            f"{timings['pydantic'] * 1000:>13.1f} {timings['orjson'] * 1000:>11.1f} "
+            f"{timings['fastapi'] / timings['orjson']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Время холодного старта приложения.
+
+import - в свежем интерпретаторе импортируется application и вызывается create_app
+(то, что каждый воркер делает до открытия порта). Заодно проверяется, что тяжёлые
+необязательные модули (alembic, numpy, geopy, redis) не импортируются при старте.
+БД не нужна.
+
+serve - запускается api/serve.py с одним воркером без миграций и замеряется, через
+сколько после запуска процесса /health и /ready начинают отвечать 200.
+Нужна БД с уже подготовленной схемой.
+
+Если медиана превышает цель, скрипт завершается с кодом 1, поэтому его можно
+запускать в CI.
+
+Запуск из корня репозитория:
+    PYTHONPATH=api python -m benchmarks.startup --runs 10 --import-target-ms 1000
+    PYTHONPATH=api python -m benchmarks.startup --profile 15
+    PYTHONPATH=api python -m benchmarks.startup --serve --ready-target-ms 3000
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+import httpx
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ("alembic", "numpy", "geopy", "redis")
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import application
+application.create_app()
+elapsed = time.perf_counter() - started
+eager = sorted(name for name in {lazy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "eager": eager}}))
+"""
+
+
+def _child_env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in (API_DIR, env.get("PYTHONPATH")) if path
+    )
+    return env
+
+
+def measure_import(runs: int) -> Tuple[List[float], List[float], List[str]]:
+    """Время import + create_app и полное время жизни процесса в секундах"""
+    code = CHILD.format(lazy=LAZY_MODULES)
+    inner, total, eager = [], [], set()
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            env=_child_env(),
+            check=True,
+        )
+        total.append(time.perf_counter() - started)
+        payload = json.loads(result.stdout.strip().splitlines()[-1])
+        inner.append(payload["seconds"])
+        eager.update(payload["eager"])
+    return inner, total, sorted(eager)
+
+
+def profile_imports(top: int) -> List[Tuple[int, int, str]]:
+    """Самые дорогие модули по собственному времени импорта (-X importtime), мкс"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(lazy=())],
+        capture_output=True,
+        text=True,
+        env=_child_env(),
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules.append((int(self_us), int(cumulative_us), name.strip()))
+    modules.sort(reverse=True)
+    return modules[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_serve(timeout: float) -> Tuple[float | None, float | None]:
+    """Секунды от запуска serve.py до первого 200 от /health и от /ready"""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(API_DIR, "serve.py"),
+            "--skip-migrations",
+            "--workers",
+            "1",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+        ],
+        env=_child_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    live = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while ready is None and time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise SystemExit(f"serve.py exited with code {process.returncode}")
+                path = "/health" if live is None else "/ready"
+                try:
+                    status = client.get(path).status_code
+                except httpx.TransportError:
+                    status = None
+                if status == 200:
+                    elapsed = time.perf_counter() - started
+                    if live is None:
+                        live = elapsed
+                    else:
+                        ready = elapsed
+                    continue
+                time.sleep(0.02)
+    finally:
+        process.terminate()
+        process.wait()
+    return live, ready
+
+
+def _check(label: str, value_ms: float | None, target_ms: float) -> bool:
+    ok = value_ms is not None and value_ms <= target_ms
+    shown = "timeout" if value_ms is None else f"{value_ms:.0f} ms"
+    print(
+        f"{label:>24}: {shown:>10} (target {target_ms:.0f} ms) {'OK' if ok else 'FAIL'}"
+    )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-target-ms", type=float, default=1000)
+    parser.add_argument("--profile", type=int, default=0, metavar="TOP")
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--ready-target-ms", type=float, default=3000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    inner, total, eager = measure_import(args.runs)
+    print(
+        f"import + create_app: median {statistics.median(inner) * 1000:.0f} ms, "
+        f"max {max(inner) * 1000:.0f} ms; "
+        f"process total: median {statistics.median(total) * 1000:.0f} ms"
+    )
+    passed = _check(
+        "import + create_app", statistics.median(inner) * 1000, args.import_target_ms
+    )
+    if eager:
+        print(f"imported at startup, expected lazy: {', '.join(eager)}")
+        passed = False
+
+    if args.profile:
+        print(f"\n{'self, ms':>9} {'cumulative, ms':>15}  module")
+        for self_us, cumulative_us, name in profile_imports(args.profile):
+            print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>15.1f}  {name}")
+        print()
+
+    if args.serve:
+        live, ready = measure_serve(args.timeout)
+        passed &= _check(
+            "process start -> /health",
+            None if live is None else live * 1000,
+            args.ready_target_ms,
+        )
+        passed &= _check(
+            "process start -> /ready",
+            None if ready is None else ready * 1000,
+            args.ready_target_ms,
+        )
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Поиск подстроки ILIKE '%...%' без индекса и с триграммным GIN-индексом.
+Данные генерируются во временной таблице, рабочие таблицы не трогаются.
+
+Запуск из корня репозитория (нужен Postgres из настроек):
+    PYTHONPATH=api python -m benchmarks.trigram_search --rows 1000000
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.settings import get_settings
+
+WORDS = (
+    "Кафе Аптека Музей Театр Магазин Салон Студия Клиника Школа Пекарня "
+    "Ресторан Библиотека Галерея Автосервис Фитнес Цветы Книги Одежда Обувь Игрушки"
+).split()
+
+TERMS = ("аптека", "пекарн", "ресторан цветы", "a1b2")
+
+
+async def _timed_search(conn, term: str, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await conn.execute(
+            text("SELECT id FROM bench_trgm_names WHERE name ILIKE :pattern"),
+            {"pattern": f"%{term}%"},
+        )
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+async def run(rows: int, repeat: int):
+    engine = create_async_engine(get_settings().POSTGRES_URL)
+    async with engine.connect() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.execute(
+            text("CREATE TEMP TABLE bench_trgm_names (id int PRIMARY KEY, name text)")
+        )
+        started = time.perf_counter()
+        await conn.execute(
+            text(
+                "INSERT INTO bench_trgm_names "
+                "SELECT i, words[1 + (random() * (cardinality(words) - 1))::int] "
+                "|| ' ' || words[1 + (random() * (cardinality(words) - 1))::int] "
+                "|| ' ' || substr(md5(i::text), 1, 8) "
+                "FROM generate_series(1, :rows) AS i, CAST(:words AS text[]) AS words"
+            ),
+            {"words": WORDS, "rows": rows},
+        )
+        await conn.execute(text("ANALYZE bench_trgm_names"))
+        print(f"generated {rows} rows in {time.perf_counter() - started:.1f}s")
+
+        before = {term: await _timed_search(conn, term, repeat) for term in TERMS}
+
+        started = time.perf_counter()
+        await conn.execute(
+            text(
+                "CREATE INDEX bench_trgm_names_name_trgm "
+                "ON bench_trgm_names USING gin (name gin_trgm_ops)"
+            )
+        )
+        await conn.execute(text("ANALYZE bench_trgm_names"))
+        print(f"built trigram index in {time.perf_counter() - started:.1f}s")
+
+        after = {term: await _timed_search(conn, term, repeat) for term in TERMS}
+
+        print(f"{'term':>16} {'seq scan, ms':>13} {'gin, ms':>9} {'speedup':>8}")
+        for term in TERMS:
+            print(
+                f"{term:>16} {before[term] * 1000:>13.1f} "
+                f"{after[term] * 1000:>9.1f} {before[term] / after[term]:>7.1f}x"
+            )
+        await conn.rollback()
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""
+Массовая загрузка зданий, видов деятельности, организаций и их связей через COPY.
+
+Файлы читаются потоком (JSON-массив, NDJSON или CSV) и загружаются в порядке
+внешних ключей одной транзакцией. Режимы:
+    full        - справочник полностью заменяется содержимым файлов, нужны файлы всех таблиц
+    incremental - добавляются только строки с новыми ключами, существующие не меняются
+    upsert      - новые строки добавляются, существующие обновляются
+
+Запуск из корня репозитория:
+    python api/bulk_import.py --dir ./api/fixtures --mode full
+    python api/bulk_import.py --organizations organizations.csv --mode upsert
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+import asyncpg
+from sqlalchemy import Table
+
+from apps.activity.models import Activity
+from apps.building.models import Building
+from apps.organization.models import (
+    MAX_ACTIVITY_DEPTH,
+    Organization,
+    organization_activities,
+)
+from core.settings import get_settings
+from utils.data_changes import NOTIFY_DATA_CHANGED
+from utils.db import init_db
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+FULL = "full"
+INCREMENTAL = "incremental"
+UPSERT = "upsert"
+
+# Порядок загрузки по внешним ключам
+TABLES: List[Table] = [
+    Building.__table__,
+    Activity.__table__,
+    Organization.__table__,
+    organization_activities,
+]
+EXTENSIONS = (".ndjson", ".jsonl", ".json", ".csv")
+BATCH_SIZE = 10000
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def _read_json_array(path: str, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Читает JSON-массив объектов по одному объекту, не загружая файл целиком"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path}: ожидается JSON-массив")
+        pos, eof = 1, False
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if buffer.startswith("]", pos):
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield item
+
+
+def _read_ndjson(path: str) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _read_csv(path: str) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Потоково читает записи из файла, формат определяется по расширению"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".ndjson", ".jsonl"):
+        return _read_ndjson(path)
+    if extension == ".json":
+        return _read_json_array(path)
+    if extension == ".csv":
+        return _read_csv(path)
+    raise ValueError(f"{path}: неизвестный формат, ожидается один из {EXTENSIONS}")
+
+
+def to_rows(table: Table, records: Iterable[dict]) -> Iterator[tuple]:
+    """
+    Превращает записи в кортежи колонок таблицы. Строки из CSV приводятся
+    к типам колонок, пустая строка в nullable-колонке считается NULL
+    """
+    columns = [
+        (column.name, column.type.python_type, column.nullable)
+        for column in table.columns
+    ]
+    for record in records:
+        row = []
+        for name, python_type, nullable in columns:
+            value = record.get(name)
+            if isinstance(value, str) and python_type is not str:
+                value = None if value == "" and nullable else python_type(value)
+            row.append(value)
+        yield tuple(row)
+
+
+def validate_activity_tree(parents: Dict[int, int | None]) -> Dict[int, int]:
+    """
+    Проверяет дерево активностей за один проход: у каждой активности есть родитель,
+    нет циклов и глубина не больше MAX_ACTIVITY_DEPTH. Возвращает глубины активностей
+    """
+    depths: Dict[int, int] = {}
+    for activity_id in parents:
+        path = []
+        on_path = set()
+        current = activity_id
+        while current is not None and current not in depths:
+            if current in on_path:
+                raise ValueError(f"Цикл в дереве активностей через id={current}")
+            if current not in parents:
+                raise ValueError(
+                    f"У активности id={path[-1]} нет родителя id={current}"
+                )
+            path.append(current)
+            on_path.add(current)
+            current = parents[current]
+        depth = 0 if current is None else depths[current]
+        for node in reversed(path):
+            depth += 1
+            if depth > MAX_ACTIVITY_DEPTH:
+                raise ValueError(
+                    f"Активность id={node} на уровне {depth}, "
+                    f"максимальный уровень: {MAX_ACTIVITY_DEPTH}"
+                )
+            depths[node] = depth
+    return depths
+
+
+def _batches(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+async def _copy(
+    conn: asyncpg.Connection,
+    table_name: str,
+    columns: List[str],
+    rows: Iterable[tuple],
+    batch_size: int,
+) -> int:
+    count = 0
+    for batch in _batches(rows, batch_size):
+        await conn.copy_records_to_table(table_name, records=batch, columns=columns)
+        count += len(batch)
+    return count
+
+
+async def _load_table(
+    conn: asyncpg.Connection,
+    table: Table,
+    rows: Iterable[tuple],
+    mode: str,
+    batch_size: int,
+) -> int:
+    """
+    В режиме full строки копируются прямо в таблицу, в остальных - во временную
+    таблицу и переносятся одним INSERT ... ON CONFLICT
+    """
+    columns = [column.name for column in table.columns]
+    if mode == FULL:
+        return await _copy(conn, table.name, columns, rows, batch_size)
+
+    staging = f"import_{table.name}"
+    await conn.execute(
+        f"CREATE TEMP TABLE {staging} (LIKE {table.name} INCLUDING DEFAULTS) "
+        "ON COMMIT DROP"
+    )
+    count = await _copy(conn, staging, columns, rows, batch_size)
+    keys = [column.name for column in table.primary_key.columns]
+    updates = [name for name in columns if name not in keys]
+    if mode == UPSERT and updates:
+        action = "DO UPDATE SET " + ", ".join(
+            f"{name} = EXCLUDED.{name}" for name in updates
+        )
+    else:
+        action = "DO NOTHING"
+    column_list, key_list = ", ".join(columns), ", ".join(keys)
+    # DISTINCT ON: повтор ключа во входных данных не должен ронять ON CONFLICT DO UPDATE
+    await conn.execute(
+        f"INSERT INTO {table.name} ({column_list}) "
+        f"SELECT DISTINCT ON ({key_list}) {column_list} FROM {staging} "
+        f"ON CONFLICT ({key_list}) {action}"
+    )
+    return count
+
+
+async def _activity_rows(
+    conn: asyncpg.Connection, records: Iterable[dict], mode: str
+) -> List[tuple]:
+    """
+    Дерево активностей держится в памяти целиком: перед загрузкой оно проверяется
+    вместе с уже существующими в БД активностями. Строки отдаются родителями вперёд,
+    чтобы COPY пачками не нарушал внешний ключ parent_id
+    """
+    table = Activity.__table__
+    rows = list(to_rows(table, records))
+    id_index = [column.name for column in table.columns].index("id")
+    parent_index = [column.name for column in table.columns].index("parent_id")
+    incoming = {row[id_index]: row[parent_index] for row in rows}
+    parents = {}
+    if mode != FULL:
+        existing = await conn.fetch("SELECT id, parent_id FROM activities")
+        parents = {record["id"]: record["parent_id"] for record in existing}
+    if mode == INCREMENTAL:
+        parents = {**incoming, **parents}
+    else:
+        parents.update(incoming)
+    depths = validate_activity_tree(parents)
+    rows.sort(key=lambda row: depths[row[id_index]])
+    return rows
+
+
+async def _rebuild_activity_closure(conn: asyncpg.Connection):
+    await conn.execute("DELETE FROM activity_closure")
+    await conn.execute(
+        """
+        WITH RECURSIVE paths AS (
+            SELECT id AS ancestor_id, id AS descendant_id, 0 AS depth
+            FROM activities
+            UNION ALL
+            SELECT paths.ancestor_id, activities.id, paths.depth + 1
+            FROM paths
+            JOIN activities ON activities.parent_id = paths.descendant_id
+        )
+        INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM paths
+        """
+    )
+
+
+async def _refresh_search_documents(conn: asyncpg.Connection):
+    """
+    Триггеры документов поиска отключены на время загрузки, документы пересобираются
+    одним запросом. До миграции a3d9c6b1f072 функции пересборки ещё нет
+    """
+    exists = await conn.fetchval(
+        "SELECT to_regproc('refresh_organization_search_documents') IS NOT NULL"
+    )
+    if exists:
+        await conn.execute("SELECT refresh_organization_search_documents(NULL)")
+
+
+async def _sync_sequence(conn: asyncpg.Connection, table_name: str):
+    """Сдвигает последовательность id за максимальный загруженный id"""
+    await conn.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), "
+        f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {table_name}"
+    )
+
+
+def check_sources(sources: Dict[str, str], mode: str):
+    """
+    Режим full очищает все таблицы справочника, поэтому требует файлы для каждой:
+    иначе загрузка одних зданий стёрла бы организации и активности
+    """
+    if mode != FULL:
+        return
+    missing = [table.name for table in TABLES if table.name not in sources]
+    if missing:
+        raise ValueError(
+            "Режим full заменяет все таблицы, не хватает файлов: " + ", ".join(missing)
+        )
+
+
+async def import_data(
+    sources: Dict[str, str], mode: str, batch_size: int = BATCH_SIZE
+) -> Dict[str, int]:
+    """Загружает файлы sources (имя таблицы -> путь) одной транзакцией"""
+    check_sources(sources, mode)
+    await init_db()
+    dsn = get_settings().POSTGRES_URL.replace("postgresql+asyncpg://", "postgresql://")
+    conn = await asyncpg.connect(dsn)
+    loaded: Dict[str, int] = {}
+    try:
+        async with conn.transaction():
+            await conn.execute("SET LOCAL organization_search.deferred = on")
+            if mode == FULL:
+                await conn.execute(
+                    "TRUNCATE organization_search_documents, organization_activities, "
+                    "organizations, activity_closure, activities, buildings"
+                )
+            for table in TABLES:
+                path = sources.get(table.name)
+                if path is None:
+                    continue
+                started = time.perf_counter()
+                records = read_records(path)
+                if table is Activity.__table__:
+                    rows = await _activity_rows(conn, records, mode)
+                else:
+                    rows = to_rows(table, records)
+                loaded[table.name] = await _load_table(
+                    conn, table, rows, mode, batch_size
+                )
+                elapsed = time.perf_counter() - started
+                print(
+                    f"{table.name}: {loaded[table.name]} rows in {elapsed:.1f}s "
+                    f"({loaded[table.name] / max(elapsed, 1e-9):.0f} rows/s)"
+                )
+            if Activity.__tablename__ in loaded or mode == FULL:
+                await _rebuild_activity_closure(conn)
+            await _refresh_search_documents(conn)
+            for table in TABLES:
+                if table.name in loaded and "id" in table.columns:
+                    await _sync_sequence(conn, table.name)
+            # Процессы API сбросят свои кэши после коммита
+            await conn.execute(NOTIFY_DATA_CHANGED)
+        for table_name in (*loaded, "organization_search_documents"):
+            await conn.execute(f"ANALYZE {table_name}")
+    finally:
+        await conn.close()
+    logger.info("Bulk import finished (%s): %s", mode, loaded)
+    return loaded
+
+
+def find_sources(directory: str) -> Dict[str, str]:
+    """Ищет в каталоге файлы вида <таблица>.<json|ndjson|jsonl|csv>"""
+    sources = {}
+    for table in TABLES:
+        for extension in EXTENSIONS:
+            path = os.path.join(directory, table.name + extension)
+            if os.path.exists(path):
+                sources[table.name] = path
+                break
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--dir", help="каталог с файлами <таблица>.<формат>")
+    for table in TABLES:
+        parser.add_argument(f"--{table.name.replace('_', '-')}", dest=table.name)
+    parser.add_argument(
+        "--mode", choices=(FULL, INCREMENTAL, UPSERT), default=INCREMENTAL
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    sources = find_sources(args.dir) if args.dir else {}
+    for table in TABLES:
+        if getattr(args, table.name):
+            sources[table.name] = getattr(args, table.name)
+    if not sources:
+        parser.error("не указано ни одного файла для загрузки")
+    try:
+        check_sources(sources, args.mode)
+    except ValueError as e:
+        parser.error(str(e))
+    started = time.perf_counter()
+    loaded = asyncio.run(import_data(sources, args.mode, args.batch_size))
+    elapsed = time.perf_counter() - started
+    total = sum(loaded.values())
+    print(f"total: {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
 import os
 from yaml import safe_load
-from dotenv import load_dotenv
+
+ENV_FILE = "./envsample"
 
 
 def load_conf() -> dict:
-    load_dotenv(dotenv_path="./envsample")
+    # В контейнере envsample нет, переменные приходят из окружения - dotenv не импортируется
+    if os.path.exists(ENV_FILE):
+        from dotenv import load_dotenv
+
+        load_dotenv(dotenv_path=ENV_FILE)
     with open(os.getenv("CONFIG_PATH")) as f:
         data = safe_load(os.path.expandvars(f.read()))
     return dict(data)
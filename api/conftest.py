@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+# До импорта настроек: тесты не пишут логи в api/logs и не шумят DEBUG в консоль
+os.environ["LOG_TO_FILE"] = "false"
+os.environ["LOG_LEVEL"] = "WARNING"
+# Тесты на Postgres (модель чтения documents, триггеры документов поиска) идут на БД
+# из TEST_POSTGRES_URL, без неё пропускаются. БД очищается перед каждым тестом
+if os.environ.get("TEST_POSTGRES_URL"):
+    os.environ["POSTGRES_URL"] = os.environ["TEST_POSTGRES_URL"]
+
+
+@pytest.fixture
+def anyio_backend():
+    """Асинхронные тесты (pytest.mark.anyio) идут в asyncio, как и приложение"""
+    return "asyncio"
@@ -1,10 +1,23 @@
 import os
 
 from functools import lru_cache
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 from config.load_config import config
 
 
+def _replica_urls() -> List[str]:
+    """URL реплик из database.replicas в config.yml: логин, пароль и БД по умолчанию как у primary"""
+    database = config.get("database", {})
+    return [
+        f"postgresql+asyncpg://{replica.get('user', database.get('user'))}:"
+        f"{replica.get('password', database.get('password'))}@{replica['host']}:"
+        f"{replica.get('port', database.get('port'))}/"
+        f"{replica.get('db_name', database.get('db_name'))}"
+        for replica in database.get("replicas") or []
+    ]
+
+
 class Settings(BaseSettings):
     STATIC_API_KEY: str = config.get("app", {}).get("static_api_key")
     PORT: int = config.get("app", {}).get("port")
@@ -18,9 +31,81 @@ class Settings(BaseSettings):
         f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASS}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES__DB_NAME}"
     )
     POSTGRES_CONN_TIMEOUT: int = 60
-    POSTGRES_MIN_CONN_SIZE: int = 1
-    POSTGRES_MAX_CONN_SIZE: int = 10
+    POSTGRES_MIN_CONN_SIZE: int = 10
+    POSTGRES_MAX_CONN_SIZE: int = 20
+    POSTGRES_POOL_PRE_PING: bool = True
+    POSTGRES_POOL_RECYCLE: int = 1800
+    POSTGRES_STATEMENT_CACHE_SIZE: int = 500
+    POSTGRES_ECHO: bool = False
+    # Реплики только для чтения; пусто - все чтения идут на primary
+    POSTGRES_REPLICA_URLS: List[str] = _replica_urls()
+    # round_robin или least_connections
+    POSTGRES_REPLICA_BALANCING: str = config.get("database", {}).get(
+        "replica_balancing", "round_robin"
+    )
+    POSTGRES_REPLICA_HEALTH_CHECK_INTERVAL: float = 5
+    POSTGRES_REPLICA_HEALTH_CHECK_TIMEOUT: float = 2
+    # Пауза переподключения и проверки соединения, которое слушает NOTIFY data_changed
+    DATA_CHANGE_LISTENER_INTERVAL: float = 5
+    ACTIVITY_CACHE_TTL: int = 300
+    # documents - списки и поиск читаются из organization_search_documents (одна строка
+    # на организацию), tables - соединением organizations, buildings и activities.
+    # documents включается явно: его тесты идут только на Postgres (TEST_POSTGRES_URL)
+    ORGANIZATION_READ_MODEL: str = "tables"
+    # db - радиус считается в Postgres, numpy - векторно в памяти процесса
+    GEO_SEARCH_ENGINE: str = "db"
+    BUILDING_GEO_INDEX_TTL: int = 300
+    # Радиус первого квадрата поиска ближайших, когда в БД нет индекса KNN (earthdistance)
+    GEO_KNN_INITIAL_RADIUS: int = 1000
+    # memory - LRU внутри процесса, redis - общий кэш, none - только ETag
+    RESPONSE_CACHE_BACKEND: str = "memory"
+    RESPONSE_CACHE_TTL: int = 60
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    # Шаг сетки в градусах, к которому округляются координаты гео-поиска, 0 - без округления.
+    # Округляется сама точка поиска: расстояния и попадание в радиус сдвигаются на полшага
+    RESPONSE_CACHE_GEO_GRID: float = 0
+    # Сколько строк выгрузки читается из курсора БД за раз
+    EXPORT_BATCH_SIZE: int = 1000
+    # Пороги, после которых запрос попадает в лог вместе со статистикой SQL
+    SLOW_REQUEST_THRESHOLD_MS: float = 500
+    REQUEST_QUERY_COUNT_THRESHOLD: int = 10
+    # Admission control для /v1: не больше ADMISSION_LIMIT запросов одновременно, сверх
+    # этого до ADMISSION_QUEUE_SIZE ждут слот не дольше ADMISSION_QUEUE_TIMEOUT секунд,
+    # остальным сразу 503 с Retry-After. Маршруты без своих лимитов делят общий лимит
+    ADMISSION_LIMIT: int = 32
+    ADMISSION_QUEUE_SIZE: int = 64
+    ADMISSION_QUEUE_TIMEOUT: float = 1.0
+    ADMISSION_RETRY_AFTER: int = 1
+    # Шаблон маршрута -> limit, queue_size, queue_timeout (недостающие берутся общие).
+    # Списки и гео-поиск намного тяжелее получения по id, выгрузка держит слот до конца потока
+    ADMISSION_ROUTE_LIMITS: Dict[str, Dict[str, float]] = {
+        "/v1/organizations/organization": {"limit": 8, "queue_size": 16},
+        "/v1/organizations/organization/search-by-geo": {
+            "limit": 8,
+            "queue_size": 16,
+        },
+        "/v1/organizations/export": {"limit": 2, "queue_size": 0},
+    }
+    # 0 - по числу CPU
+    SERVER_WORKERS: int = 0
+    SERVER_GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+    # Секунды между SIGTERM и остановкой приёма соединений: /ready уже отвечает 503,
+    # а запросы ещё принимаются, пока балансировщик не уберёт процесс. 0 - без паузы
+    SERVER_PRE_STOP_DELAY: float = 5
     LOG_LEVEL: str = config.get("app", {}).get("log_level", "INFO")
+    # text или json - одна JSON-строка на запись
+    LOG_FORMAT: str = "text"
+    # False - только консоль, каталог logs не создаётся (в контейнере логи собираются из stdout)
+    LOG_TO_FILE: bool = True
+    # Очередь записей перед потоком записи; drop_new или drop_oldest при переполнении
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_OVERFLOW_POLICY: str = "drop_new"
+    # size - по размеру файла, time - по времени (LOG_ROTATION_WHEN), none - без ротации
+    LOG_ROTATION: str = "size"
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT: int = 5
+    LOG_ROTATION_WHEN: str = "midnight"
 
 
 @lru_cache
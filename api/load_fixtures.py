@@ -1,6 +1,9 @@
 import json
 import asyncio
 
+from sqlalchemy import text
+
+from utils.data_changes import NOTIFY_DATA_CHANGED
 from utils.db import async_session, init_db
 from apps.organization.models import Organization, organization_activities
 from apps.building.models import Building
@@ -42,6 +45,8 @@ async def populate_db():
                         activity_id=link["activity_id"],
                     )
                 )
+            # Процессы API сбросят свои кэши после коммита
+            await session.execute(text(NOTIFY_DATA_CHANGED))
 
         await session.commit()
         print("Database populated successfully!")
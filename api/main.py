@@ -1,10 +1,6 @@
-import uvicorn
-from application import create_app
-from core.settings import get_settings
-
-app = create_app()
-settings = get_settings()
+"""Прежняя точка входа: запускает то же, что и api/serve.py"""
 
+from serve import main
 
 if __name__ == "__main__":
-    uvicorn.run(app, host=settings.HOST, port=settings.PORT)
+    main()
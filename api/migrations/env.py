@@ -1,10 +1,12 @@
 import asyncio
+import logging
 from logging.config import fileConfig
 
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
-from utils.db import Base
+from sqlalchemy import text
+from utils.db import MIGRATION_LOCK_ID, Base
 from alembic import context
 from core.settings import get_settings
 
@@ -14,7 +16,8 @@ config = context.config
 config.set_main_option("sqlalchemy.url", get_settings().POSTGRES_URL)
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+# Внутри приложения логирование уже настроено utils.logger, его обработчики не заменяем
+if config.config_file_name is not None and not logging.getLogger().handlers:
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -54,10 +57,19 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
-
-    with context.begin_transaction():
-        context.run_migrations()
+    # Сессионная advisory-блокировка: параллельно запущенные upgrade выполняются по очереди,
+    # второй застаёт схему уже на head и ничего не делает
+    lock = {"lock_id": MIGRATION_LOCK_ID}
+    connection.execute(text("SELECT pg_advisory_lock(:lock_id)"), lock)
+    connection.commit()
+    try:
+        context.configure(connection=connection, target_metadata=target_metadata)
+
+        with context.begin_transaction():
+            context.run_migrations()
+    finally:
+        connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), lock)
+        connection.commit()
 
 
 async def run_async_migrations() -> None:
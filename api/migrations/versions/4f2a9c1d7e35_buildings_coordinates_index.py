@@ -0,0 +1,36 @@
+"""Buildings coordinates index
+
+Revision ID: 4f2a9c1d7e35
+Revises: 71cb4dfc2a03
+Create Date: 2026-10-18 10:12:41.203518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4f2a9c1d7e35"
+down_revision: Union[str, Sequence[str], None] = "71cb4dfc2a03"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_buildings_latitude_longitude",
+        "buildings",
+        ["latitude", "longitude"],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_buildings_latitude_longitude", table_name="buildings", if_exists=True
+    )
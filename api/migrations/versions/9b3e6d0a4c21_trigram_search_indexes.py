@@ -0,0 +1,45 @@
+"""Trigram search indexes
+
+Revision ID: 9b3e6d0a4c21
+Revises: 4f2a9c1d7e35
+Create Date: 2026-10-18 12:47:05.518204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9b3e6d0a4c21"
+down_revision: Union[str, Sequence[str], None] = "4f2a9c1d7e35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGRAM_INDEXES = (
+    ("ix_organizations_name_trgm", "organizations", "name"),
+    ("ix_buildings_address_trgm", "buildings", "address"),
+    ("ix_activities_name_trgm", "activities", "name"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index_name, table_name, column_name in TRIGRAM_INDEXES:
+        op.create_index(
+            index_name,
+            table_name,
+            [column_name],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={column_name: "gin_trgm_ops"},
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for index_name, table_name, _ in TRIGRAM_INDEXES:
+        op.drop_index(index_name, table_name=table_name, if_exists=True)
@@ -0,0 +1,275 @@
+"""Organization search documents
+
+Revision ID: a3d9c6b1f072
+Revises: e5a8f3c2d416
+Create Date: 2026-10-18 18:42:10.517304
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3d9c6b1f072"
+down_revision: Union[str, Sequence[str], None] = "e5a8f3c2d416"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE = "organization_search_documents"
+
+# Дерево строится только из видимых активностей: привязанных и их предков.
+# plpgsql, а не sql: тело рекурсивной функции проверяется при вызове, а не при создании
+ACTIVITY_TREE_FUNCTION = """
+CREATE OR REPLACE FUNCTION activity_tree_json(root_id integer, visible integer[])
+RETURNS jsonb LANGUAGE plpgsql STABLE AS $$
+BEGIN
+    RETURN (
+        SELECT jsonb_build_object(
+            'id', a.id,
+            'name', a.name,
+            'children', COALESCE(
+                (
+                    SELECT jsonb_agg(activity_tree_json(c.id, visible) ORDER BY c.id)
+                    FROM activities c
+                    WHERE c.parent_id = a.id AND c.id = ANY(visible)
+                ),
+                '[]'::jsonb
+            )
+        )
+        FROM activities a
+        WHERE a.id = root_id
+    );
+END
+$$
+"""
+
+# NULL вместо списка id - пересобрать все документы
+REFRESH_FUNCTION = """
+CREATE OR REPLACE FUNCTION refresh_organization_search_documents(organization_ids integer[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO organization_search_documents AS d (
+        id, name, phone, building_id, address, latitude, longitude,
+        activity_ids, activity_tree
+    )
+    SELECT
+        o.id, o.name, o.phone, o.building_id, b.address, b.latitude, b.longitude,
+        linked.ids,
+        COALESCE(
+            (
+                SELECT jsonb_agg(activity_tree_json(r.id, linked.ids) ORDER BY r.id)
+                FROM activities r
+                WHERE r.id = ANY(linked.ids) AND r.parent_id IS NULL
+            ),
+            '[]'::jsonb
+        )
+    FROM organizations o
+    JOIN buildings b ON b.id = o.building_id
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(
+            array_agg(DISTINCT c.ancestor_id ORDER BY c.ancestor_id), '{}'
+        ) AS ids
+        FROM organization_activities oa
+        JOIN activity_closure c ON c.descendant_id = oa.activity_id
+        WHERE oa.organization_id = o.id
+    ) linked
+    WHERE organization_ids IS NULL OR o.id = ANY(organization_ids)
+    ON CONFLICT (id) DO UPDATE SET
+        name = EXCLUDED.name,
+        phone = EXCLUDED.phone,
+        building_id = EXCLUDED.building_id,
+        address = EXCLUDED.address,
+        latitude = EXCLUDED.latitude,
+        longitude = EXCLUDED.longitude,
+        activity_ids = EXCLUDED.activity_ids,
+        activity_tree = EXCLUDED.activity_tree
+    -- Неизменившиеся документы не переписываются
+    WHERE (
+        d.name, d.phone, d.building_id, d.address, d.latitude, d.longitude,
+        d.activity_ids, d.activity_tree
+    ) IS DISTINCT FROM (
+        EXCLUDED.name, EXCLUDED.phone, EXCLUDED.building_id, EXCLUDED.address,
+        EXCLUDED.latitude, EXCLUDED.longitude, EXCLUDED.activity_ids,
+        EXCLUDED.activity_tree
+    );
+END
+$$
+"""
+
+# Массовая загрузка выставляет SET LOCAL organization_search.deferred = on
+# и пересобирает документы один раз в конце транзакции
+DEFERRED_FUNCTION = """
+CREATE OR REPLACE FUNCTION organization_search_documents_deferred()
+RETURNS boolean LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(current_setting('organization_search.deferred', true), '') = 'on'
+$$
+"""
+
+# (таблица, событие, переходные таблицы, id затронутых организаций).
+# Триггеры уровня оператора: многострочный INSERT/UPDATE пересобирает документы одним вызовом.
+# Удаление организации убирает документ каскадом по внешнему ключу
+TRIGGERS = (
+    ("organizations", "INSERT", "NEW TABLE AS changed", "SELECT id FROM changed"),
+    ("organizations", "UPDATE", "NEW TABLE AS changed", "SELECT id FROM changed"),
+    (
+        "buildings",
+        "UPDATE",
+        "NEW TABLE AS changed",
+        "SELECT o.id FROM organizations o JOIN changed ON o.building_id = changed.id",
+    ),
+    (
+        "activities",
+        "UPDATE",
+        "NEW TABLE AS changed",
+        "SELECT DISTINCT oa.organization_id FROM changed "
+        "JOIN activity_closure c ON c.ancestor_id = changed.id "
+        "JOIN organization_activities oa ON oa.activity_id = c.descendant_id",
+    ),
+    (
+        "activity_closure",
+        "INSERT",
+        "NEW TABLE AS changed",
+        "SELECT DISTINCT oa.organization_id FROM changed "
+        "JOIN organization_activities oa ON oa.activity_id = changed.descendant_id",
+    ),
+    (
+        "activity_closure",
+        "DELETE",
+        "OLD TABLE AS changed",
+        "SELECT DISTINCT oa.organization_id FROM changed "
+        "JOIN organization_activities oa ON oa.activity_id = changed.descendant_id",
+    ),
+    (
+        "organization_activities",
+        "INSERT",
+        "NEW TABLE AS changed",
+        "SELECT organization_id FROM changed",
+    ),
+    (
+        "organization_activities",
+        "UPDATE",
+        "OLD TABLE AS changed_old NEW TABLE AS changed",
+        "SELECT organization_id FROM changed "
+        "UNION SELECT organization_id FROM changed_old",
+    ),
+    (
+        "organization_activities",
+        "DELETE",
+        "OLD TABLE AS changed",
+        "SELECT organization_id FROM changed",
+    ),
+)
+
+
+def _trigger_name(table: str, event: str) -> str:
+    return f"{table}_{event.lower()}_search_documents"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table(TABLE):
+        op.create_table(
+            TABLE,
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=255), nullable=False),
+            sa.Column("phone", sa.String(length=12), nullable=True),
+            sa.Column("building_id", sa.Integer(), nullable=False),
+            sa.Column("address", sa.String(length=500), nullable=False),
+            sa.Column("latitude", sa.Float(), nullable=False),
+            sa.Column("longitude", sa.Float(), nullable=False),
+            sa.Column(
+                "activity_ids",
+                postgresql.ARRAY(sa.Integer()),
+                server_default="{}",
+                nullable=False,
+            ),
+            sa.Column(
+                "activity_tree",
+                postgresql.JSONB(),
+                server_default="[]",
+                nullable=False,
+            ),
+            sa.ForeignKeyConstraint(["id"], ["organizations.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    op.create_index(
+        "ix_organization_search_documents_name_trgm",
+        TABLE,
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_organization_search_documents_address_trgm",
+        TABLE,
+        ["address"],
+        postgresql_using="gin",
+        postgresql_ops={"address": "gin_trgm_ops"},
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_organization_search_documents_activity_ids",
+        TABLE,
+        ["activity_ids"],
+        postgresql_using="gin",
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_organization_search_documents_latitude_longitude",
+        TABLE,
+        ["latitude", "longitude"],
+        if_not_exists=True,
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_organization_search_documents_ll_to_earth "
+        f"ON {TABLE} USING gist (ll_to_earth(latitude, longitude))"
+    )
+
+    op.execute(ACTIVITY_TREE_FUNCTION)
+    op.execute(REFRESH_FUNCTION)
+    op.execute(DEFERRED_FUNCTION)
+    for table, event, referencing, organization_ids in TRIGGERS:
+        name = _trigger_name(table, event)
+        op.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION {name}() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                IF NOT organization_search_documents_deferred() THEN
+                    PERFORM refresh_organization_search_documents(
+                        ARRAY({organization_ids})
+                    );
+                END IF;
+                RETURN NULL;
+            END
+            $$
+            """
+        )
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        op.execute(
+            f"CREATE TRIGGER {name} AFTER {event} ON {table} "
+            f"REFERENCING {referencing} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION {name}()"
+        )
+    # Заполняем документы для уже существующих организаций
+    op.execute("SELECT refresh_organization_search_documents(NULL)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, event, _, _ in TRIGGERS:
+        name = _trigger_name(table, event)
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {name}()")
+    op.execute("DROP FUNCTION IF EXISTS organization_search_documents_deferred()")
+    op.execute(
+        "DROP FUNCTION IF EXISTS refresh_organization_search_documents(integer[])"
+    )
+    op.execute("DROP FUNCTION IF EXISTS activity_tree_json(integer, integer[])")
+    op.drop_table(TABLE)
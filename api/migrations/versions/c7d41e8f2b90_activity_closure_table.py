@@ -0,0 +1,65 @@
+"""Activity closure table
+
+Revision ID: c7d41e8f2b90
+Revises: 9b3e6d0a4c21
+Create Date: 2026-10-18 14:05:33.781126
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7d41e8f2b90"
+down_revision: Union[str, Sequence[str], None] = "9b3e6d0a4c21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table("activity_closure"):
+        op.create_table(
+            "activity_closure",
+            sa.Column("ancestor_id", sa.Integer(), nullable=False),
+            sa.Column("descendant_id", sa.Integer(), nullable=False),
+            sa.Column("depth", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(
+                ["ancestor_id"], ["activities.id"], ondelete="CASCADE"
+            ),
+            sa.ForeignKeyConstraint(
+                ["descendant_id"], ["activities.id"], ondelete="CASCADE"
+            ),
+            sa.PrimaryKeyConstraint("ancestor_id", "descendant_id"),
+        )
+    op.create_index(
+        "ix_activity_closure_descendant_id",
+        "activity_closure",
+        ["descendant_id", "ancestor_id"],
+        unique=False,
+        if_not_exists=True,
+    )
+    # Заполняем замыкание для уже существующего дерева
+    op.execute(
+        """
+        WITH RECURSIVE paths AS (
+            SELECT id AS ancestor_id, id AS descendant_id, 0 AS depth
+            FROM activities
+            UNION ALL
+            SELECT paths.ancestor_id, activities.id, paths.depth + 1
+            FROM paths
+            JOIN activities ON activities.parent_id = paths.descendant_id
+        )
+        INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM paths
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("activity_closure")
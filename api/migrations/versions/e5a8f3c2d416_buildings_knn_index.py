@@ -0,0 +1,34 @@
+"""Buildings KNN index
+
+Revision ID: e5a8f3c2d416
+Revises: c7d41e8f2b90
+Create Date: 2026-10-18 16:21:47.390215
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a8f3c2d416"
+down_revision: Union[str, Sequence[str], None] = "c7d41e8f2b90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # earthdistance хранит точки как cube, GiST по нему отдаёт ближайшие через <->
+    op.execute("CREATE EXTENSION IF NOT EXISTS cube")
+    op.execute("CREATE EXTENSION IF NOT EXISTS earthdistance")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_buildings_ll_to_earth "
+        "ON buildings USING gist (ll_to_earth(latitude, longitude))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_buildings_ll_to_earth", table_name="buildings", if_exists=True)
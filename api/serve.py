@@ -0,0 +1,92 @@
+"""
+Production-запуск приложения в несколько воркеров uvicorn.
+
+Схема БД готовится один раз в главном процессе до старта воркеров, сами воркеры
+только прогревают пул соединений и кэши (готовность - GET /ready).
+uvloop и httptools используются, если установлены.
+По SIGTERM воркер сразу отвечает 503 на /ready и ещё SERVER_PRE_STOP_DELAY секунд
+принимает запросы, пока балансировщик не уберёт его из ротации. Затем uvicorn перестаёт
+принимать соединения, дожидается текущих запросов (не дольше SERVER_GRACEFUL_SHUTDOWN_TIMEOUT)
+и закрывает пул соединений с БД.
+
+Запуск из корня репозитория:
+    python api/serve.py --workers 4
+    python api/serve.py --migrate-only   # отдельный шаг деплоя, затем --skip-migrations
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from core.settings import get_settings
+from utils.logger import get_logger
+from utils.migrations import prepare_database_sync
+from utils.server import PreStopServer
+
+logger = get_logger(__name__)
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument(
+        "--workers", type=int, default=settings.SERVER_WORKERS or os.cpu_count()
+    )
+    parser.add_argument(
+        "--skip-migrations",
+        action="store_true",
+        help="схема уже подготовлена отдельным шагом деплоя",
+    )
+    parser.add_argument(
+        "--migrate-only",
+        action="store_true",
+        help="только подготовить схему и выйти",
+    )
+    args = parser.parse_args()
+
+    if not args.skip_migrations:
+        prepare_database_sync()
+    if args.migrate_only:
+        return
+
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    logger.info(
+        "Starting %d workers on %s:%s (uvloop: %s, httptools: %s)",
+        args.workers,
+        args.host,
+        args.port,
+        has_uvloop,
+        has_httptools,
+    )
+    config = uvicorn.Config(
+        "application:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if has_uvloop else "asyncio",
+        http="httptools" if has_httptools else "h11",
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
+    # Как uvicorn.run, но со своим сервером: пауза перед остановкой нужна каждому воркеру.
+    # Супервизор воркеров пересылает им SIGTERM
+    server = PreStopServer(config, settings.SERVER_PRE_STOP_DELAY)
+    if config.workers > 1:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+    if not server.started and config.workers == 1:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
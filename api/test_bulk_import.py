@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from bulk_import import (
+    FULL,
+    INCREMENTAL,
+    TABLES,
+    _activity_rows,
+    check_sources,
+    validate_activity_tree,
+)
+from apps.organization.models import MAX_ACTIVITY_DEPTH
+
+
+def test_validate_activity_tree_returns_depths():
+    parents = {3: 2, 1: None, 2: 1, 4: None}
+    assert validate_activity_tree(parents) == {1: 1, 2: 2, 3: 3, 4: 1}
+
+
+def test_validate_activity_tree_rejects_cycle():
+    with pytest.raises(ValueError, match="Цикл"):
+        validate_activity_tree({1: None, 2: 3, 3: 2})
+
+
+def test_validate_activity_tree_rejects_self_parent():
+    with pytest.raises(ValueError, match="Цикл"):
+        validate_activity_tree({1: 1})
+
+
+def test_validate_activity_tree_rejects_missing_parent():
+    with pytest.raises(ValueError, match="нет родителя id=7"):
+        validate_activity_tree({1: None, 2: 7})
+
+
+def test_validate_activity_tree_rejects_too_deep():
+    parents = {1: None}
+    for activity_id in range(2, MAX_ACTIVITY_DEPTH + 2):
+        parents[activity_id] = activity_id - 1
+    with pytest.raises(ValueError, match=f"id={MAX_ACTIVITY_DEPTH + 1}"):
+        validate_activity_tree(parents)
+
+
+def test_validate_activity_tree_accepts_max_depth():
+    parents = {1: None}
+    for activity_id in range(2, MAX_ACTIVITY_DEPTH + 1):
+        parents[activity_id] = activity_id - 1
+    assert max(validate_activity_tree(parents).values()) == MAX_ACTIVITY_DEPTH
+
+
+def test_activity_rows_are_ordered_parents_first():
+    records = [
+        {"id": 3, "name": "c", "parent_id": 2},
+        {"id": 5, "name": "e", "parent_id": 4},
+        {"id": 1, "name": "a", "parent_id": None},
+        {"id": 2, "name": "b", "parent_id": 1},
+        {"id": 4, "name": "d", "parent_id": None},
+    ]
+    rows = asyncio.run(_activity_rows(None, records, FULL))
+    # Внутри уровня сохраняется порядок файла
+    assert [row[0] for row in rows] == [1, 4, 5, 2, 3]
+
+
+def test_full_import_requires_every_table():
+    with pytest.raises(ValueError, match="organizations"):
+        check_sources({"buildings": "buildings.csv"}, FULL)
+    check_sources({table.name: f"{table.name}.csv" for table in TABLES}, FULL)
+
+
+def test_partial_incremental_import_is_allowed():
+    check_sources({"buildings": "buildings.csv"}, INCREMENTAL)
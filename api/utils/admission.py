@@ -0,0 +1,240 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Mapping, Sequence, Tuple
+
+from fastapi.responses import ORJSONResponse
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.settings import get_settings
+from .logger import get_logger
+from .metrics import Counter, Gauge, Histogram, registry
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+DEFAULT_LIMITER = "default"
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+
+ADMISSION_IN_FLIGHT = registry.register(
+    Gauge(
+        "admission_in_flight",
+        "Requests admitted and being processed by limiter",
+        ("limiter",),
+    )
+)
+ADMISSION_QUEUE_DEPTH = registry.register(
+    Gauge(
+        "admission_queue_depth",
+        "Requests waiting for a free slot by limiter",
+        ("limiter",),
+    )
+)
+ADMISSION_REJECTED = registry.register(
+    Counter(
+        "admission_rejected_total",
+        "Requests rejected with 503 by limiter and reason",
+        ("limiter", "reason"),
+    )
+)
+ADMISSION_QUEUE_SECONDS = registry.register(
+    Histogram(
+        "admission_queue_wait_seconds",
+        "Time admitted requests spent in the wait queue",
+        ("limiter",),
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    )
+)
+
+
+class AdmissionLimiter:
+    """
+    Не больше limit запросов одновременно. Остальные ждут в очереди из queue_size мест
+    не дольше queue_timeout секунд, в порядке поступления. Когда очередь полна
+    или время ожидания вышло, запрос сразу отклоняется
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {QUEUE_FULL: 0, QUEUE_TIMEOUT: 0}
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> str | None:
+        """Занимает слот. Возвращает None или причину отказа"""
+        if self.in_flight < self.limit and not self._waiters:
+            self._admit(0.0)
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return self._reject(QUEUE_FULL)
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.inc(self.name)
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Слот успели передать в момент отмены - отдаём его следующему
+                self.release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return self._reject(QUEUE_TIMEOUT)
+        finally:
+            # Отменённое ожидание могло уже быть пропущено release()
+            if waiter.cancelled() and waiter in self._waiters:
+                self._waiters.remove(waiter)
+            ADMISSION_QUEUE_DEPTH.dec(self.name)
+        # Слот передан освободившимся запросом, in_flight уже учтён
+        self.admitted += 1
+        ADMISSION_QUEUE_SECONDS.observe(time.perf_counter() - started, self.name)
+        return None
+
+    def release(self):
+        """Передаёт слот первому ждущему запросу или освобождает его"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.dec(self.name)
+
+    def _admit(self, waited: float):
+        self.in_flight += 1
+        self.admitted += 1
+        ADMISSION_IN_FLIGHT.inc(self.name)
+        ADMISSION_QUEUE_SECONDS.observe(waited, self.name)
+
+    def _reject(self, reason: str) -> str:
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED.inc(self.name, reason)
+        return reason
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+
+class AdmissionController:
+    """
+    Лимитеры по шаблонам маршрутов. Маршруты без своих лимитов
+    делят общий лимитер default
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        queue_size: int,
+        queue_timeout: float,
+        route_limits: Mapping[str, Mapping[str, float]],
+    ):
+        self.default = AdmissionLimiter(
+            DEFAULT_LIMITER, limit, queue_size, queue_timeout
+        )
+        self.limiters: Dict[str, AdmissionLimiter] = {DEFAULT_LIMITER: self.default}
+        for path, limits in route_limits.items():
+            self.limiters[path] = AdmissionLimiter(
+                path,
+                int(limits.get("limit", limit)),
+                int(limits.get("queue_size", queue_size)),
+                float(limits.get("queue_timeout", queue_timeout)),
+            )
+
+    def resolve(self, scope: Scope) -> Tuple[BaseRoute, AdmissionLimiter] | None:
+        """Маршрут запроса и его лимитер, None для путей без маршрута (их отдаст 404/405)"""
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route, self.limiters.get(route.path, self.default)
+        return None
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+admission_controller = AdmissionController(
+    settings.ADMISSION_LIMIT,
+    settings.ADMISSION_QUEUE_SIZE,
+    settings.ADMISSION_QUEUE_TIMEOUT,
+    settings.ADMISSION_ROUTE_LIMITS,
+)
+
+
+class AdmissionControlMiddleware:
+    """
+    Пропускает запросы к prefix через лимитер маршрута до авторизации и сессии БД.
+    Слот держится до конца ответа, включая потоковую выгрузку.
+    Сверх лимита и очереди - сразу 503 с Retry-After
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController = admission_controller,
+        prefix: str = "/v1",
+        skip_prefixes: Sequence[str] = ("/v1/internal",),
+        retry_after: int = settings.ADMISSION_RETRY_AFTER,
+    ):
+        self.app = app
+        self.controller = controller
+        self.prefix = prefix
+        self.skip_prefixes = tuple(skip_prefixes)
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        path = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or not path.startswith(self.prefix)
+            or path.startswith(self.skip_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        resolved = self.controller.resolve(scope)
+        if resolved is None:
+            await self.app(scope, receive, send)
+            return
+        route, limiter = resolved
+
+        rejected = await limiter.acquire()
+        if rejected is not None:
+            logger.warning(
+                "Request rejected by admission control: %s (%s)",
+                limiter.name,
+                rejected,
+                extra={"limiter": limiter.name, "reason": rejected, "path": path},
+            )
+            # До роутера запрос не дошёл: маршрут для меток MetricsMiddleware
+            scope["route"] = route
+            response = ORJSONResponse(
+                status_code=503,
+                content={"detail": "Сервис перегружен, повторите запрос позже"},
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, NamedTuple, TypeVar
+
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .logger import get_logger
+from .metrics import CACHE_REQUESTS
+from .singleflight import SingleFlight
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class SnapshotCache(Generic[T]):
+    """
+    Кэш снимка редко меняющихся данных внутри процесса.
+    Снимок перечитывается по истечении TTL или после invalidate()
+    """
+
+    name = "snapshot"
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._snapshot: T | None = None
+        self._loaded_at = 0.0
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    async def _load(self, db: AsyncSession) -> T:
+        raise NotImplementedError
+
+    def invalidate(self):
+        logger.debug("%s cache invalidated", self.name)
+        self._stale = True
+
+    def is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and not self._stale
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    async def load(self, db: AsyncSession) -> T:
+        """Принудительно перечитывает снимок"""
+        self._stale = False
+        self._snapshot = await self._load(db)
+        self._loaded_at = time.monotonic()
+        return self._snapshot
+
+    async def get(self, db: AsyncSession, force: bool = False) -> T:
+        """Возвращает актуальный снимок, при необходимости перечитывая его один раз"""
+        snapshot = self._snapshot
+        if not force and self.is_fresh():
+            CACHE_REQUESTS.inc(self.name, "hit")
+            return snapshot
+        CACHE_REQUESTS.inc(self.name, "miss")
+        async with self._lock:
+            # Пока ждали блокировку, снимок мог обновить другой запрос
+            if self._snapshot is not snapshot and self.is_fresh():
+                return self._snapshot
+            return await self.load(db)
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+class LRUCache:
+    """LRU-кэш внутри процесса с ограничением по размеру и TTL записей"""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, CachedResponse]] = OrderedDict()
+
+    async def get(self, key: str) -> CachedResponse | None:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: CachedResponse):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class RedisCache:
+    """
+    Кэш в Redis. Принимает любой клиент с интерфейсом redis.asyncio.Redis,
+    поэтому в тестах его можно заменить локальной заглушкой
+    """
+
+    def __init__(self, client, ttl: int, prefix: str = "response-cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: int) -> "RedisCache":
+        import redis.asyncio as redis
+
+        return cls(redis.from_url(url), ttl)
+
+    async def get(self, key: str) -> CachedResponse | None:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b"\n")
+        return CachedResponse(etag.decode(), body)
+
+    async def set(self, key: str, value: CachedResponse):
+        await self.client.set(
+            self.prefix + key, value.etag.encode() + b"\n" + value.body, ex=self.ttl
+        )
+
+    async def clear(self):
+        keys = [key async for key in self.client.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+
+class NullCache:
+    """Заглушка: ничего не хранит, ETag всё равно отдаётся"""
+
+    async def get(self, key: str) -> CachedResponse | None:
+        return None
+
+    async def set(self, key: str, value: CachedResponse):
+        pass
+
+    async def clear(self):
+        pass
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _dump_body(payload: BaseModel | dict) -> bytes:
+    """Кодирует ответ в JSON: готовые словари через orjson, схемы через pydantic"""
+    if isinstance(payload, BaseModel):
+        return payload.model_dump_json().encode()
+    return orjson.dumps(payload)
+
+
+class ResponseCache:
+    """
+    Кэш готовых JSON-ответов с ETag.
+    При совпадении If-None-Match с сохранённым ETag отвечает 304, не трогая БД.
+    invalidate() меняет поколение ключей, так что ответы, посчитанные до изменения
+    данных, больше не находятся. Одновременные промахи по одному ключу склеиваются:
+    ответ строится один раз, остальные запросы ждут его
+    """
+
+    def __init__(self, backend, name: str = "response"):
+        self.backend = backend
+        self.name = name
+        self.generation = 0
+        self._clear_tasks: set[asyncio.Task] = set()
+        self._flights: SingleFlight[CachedResponse] = SingleFlight(name)
+
+    async def _produce(
+        self, key: str, produce: Callable[[], Awaitable[BaseModel | dict]]
+    ) -> CachedResponse:
+        # Ответ собран сервисом, повторная валидация FastAPI не нужна
+        body = _dump_body(await produce())
+        entry = CachedResponse(f'"{hashlib.sha1(body).hexdigest()}"', body)
+        await self.backend.set(key, entry)
+        return entry
+
+    def invalidate(self):
+        self.generation += 1
+        logger.debug("Response cache invalidated, generation %d", self.generation)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.backend.clear())
+        self._clear_tasks.add(task)
+        task.add_done_callback(self._clear_tasks.discard)
+
+    async def respond(
+        self,
+        request: Request,
+        key: str,
+        produce: Callable[[], Awaitable[BaseModel | dict]],
+    ) -> Response:
+        """
+        Отдаёт ответ по ключу из кэша или строит его через produce и кэширует.
+        produce общий для всех запросов с этим ключом, поэтому не должен зависеть
+        от ресурсов одного запроса (например, его сессии БД)
+        """
+        key = f"{self.generation}:{key}"
+        entry = await self.backend.get(key)
+        CACHE_REQUESTS.inc(self.name, "miss" if entry is None else "hit")
+        if entry is None:
+            # Поколение в ключе: запрос после invalidate() не присоединится
+            # к построению ответа по старым данным
+            entry = await self._flights.do(key, lambda: self._produce(key, produce))
+        headers = {"ETag": entry.etag}
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=entry.body, media_type="application/json", headers=headers
+        )
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Callable
+
+import asyncpg
+
+from core.settings import get_settings
+from .logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Канал Postgres, в который загрузчики вне процесса API сообщают об изменении данных
+DATA_CHANGED_CHANNEL = "data_changed"
+# Выполняется в транзакции загрузки: уведомление уходит только после коммита
+NOTIFY_DATA_CHANGED = f"NOTIFY {DATA_CHANGED_CHANNEL}"
+
+
+def listener_dsn(url: str = settings.POSTGRES_URL) -> str:
+    """DSN для asyncpg из URL SQLAlchemy"""
+    return url.replace("postgresql+asyncpg://", "postgresql://")
+
+
+class DataChangeListener:
+    """
+    Сбрасывает кэши процесса, когда данные меняются в обход его ORM: массовая загрузка,
+    загрузка фикстур. Слушает канал на primary отдельным соединением вне пула.
+    Пока соединения нет, уведомления теряются, поэтому после переподключения
+    кэши сбрасываются сразу
+    """
+
+    def __init__(
+        self,
+        on_change: Callable[[], None],
+        dsn: str | None = None,
+        channel: str = DATA_CHANGED_CHANNEL,
+    ):
+        self.on_change = on_change
+        self.dsn = dsn or listener_dsn()
+        self.channel = channel
+
+    def _notified(self, connection, pid, channel, payload):
+        logger.info("Data changed outside the API process, invalidating caches")
+        self.on_change()
+
+    async def _listen(self, reconnected: bool, interval: float):
+        conn = await asyncpg.connect(self.dsn, timeout=interval)
+        lost = asyncio.Event()
+        conn.add_termination_listener(lambda _: lost.set())
+        try:
+            await conn.add_listener(self.channel, self._notified)
+            if reconnected:
+                logger.info("Data change listener reconnected, invalidating caches")
+                self.on_change()
+            while not lost.is_set():
+                try:
+                    async with asyncio.timeout(interval):
+                        await lost.wait()
+                except TimeoutError:
+                    # Обрыв без закрытия TCP-соединения замечается только по запросу
+                    async with asyncio.timeout(interval):
+                        await conn.execute("SELECT 1")
+        finally:
+            if not conn.is_closed():
+                conn.terminate()
+
+    async def run(self, interval: float = settings.DATA_CHANGE_LISTENER_INTERVAL):
+        """Фоновая задача: слушает канал и переподключается после обрыва"""
+        reconnected = False
+        while True:
+            try:
+                await self._listen(reconnected, interval)
+                logger.warning("Data change listener lost its connection")
+            except (
+                OSError,
+                TimeoutError,
+                asyncpg.PostgresError,
+                asyncpg.InterfaceError,
+            ) as e:
+                logger.warning("Data change listener failed: %r", e)
+            reconnected = True
+            await asyncio.sleep(interval)
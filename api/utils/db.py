@@ -1,26 +1,347 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, List, Sequence, TypeVar
+
+from sqlalchemy import DDL, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import queue as sqla_queue
 
 from core.settings import get_settings
 from .logger import get_logger
+from .metrics import CallbackCounter, CallbackGauge, Gauge, registry
+from .query_stats import after_cursor_execute, before_cursor_execute
 
 logger = get_logger(__name__)
 
 settings = get_settings()
-engine = create_async_engine(settings.POSTGRES_URL, echo=True)
+
+# Ключ advisory-блокировки Postgres, под которой схема меняется только одним процессом
+MIGRATION_LOCK_ID = 7_203_946_517
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, который считает, сколько запросы ждали соединение.
+    Ожиданием считается только выдача из исчерпанного пула: быстрые выдачи
+    и открытие новых соединений в счётчики не попадают
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        # Пока можно открыть соединение сверх пула (или без ограничения, max_overflow=-1),
+        # выдача не ждёт: открытие нового соединения ожиданием не считается
+        if self._max_overflow == -1 or self._overflow < self._max_overflow:
+            return super()._do_get()
+        # Пул исчерпан по размеру, но свободное соединение может лежать в очереди.
+        # Забираем его без ожидания: ожидание очереди отдаёт управление другим задачам
+        try:
+            return self._pool.get(False)
+        except sqla_queue.Empty:
+            pass
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_count += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            # До заполнения пула SQLAlchemy считает overflow отрицательным
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout": self.timeout(),
+            "wait_count": self.wait_count,
+            "wait_time_total": round(self.wait_time_total, 6),
+            "wait_time_max": round(self.wait_time_max, 6),
+        }
+
+
+def create_engine_from_settings(url: str) -> AsyncEngine:
+    """Создаёт движок с пулом, настроенным из Settings"""
+    if settings.POSTGRES_ECHO:
+        # Вместо echo=True: SQL идёт через общий неблокирующий обработчик, а не свой StreamHandler
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.POSTGRES_MIN_CONN_SIZE,
+        max_overflow=max(
+            settings.POSTGRES_MAX_CONN_SIZE - settings.POSTGRES_MIN_CONN_SIZE, 0
+        ),
+        pool_timeout=settings.POSTGRES_CONN_TIMEOUT,
+        pool_pre_ping=settings.POSTGRES_POOL_PRE_PING,
+        pool_recycle=settings.POSTGRES_POOL_RECYCLE,
+        connect_args={
+            "prepared_statement_cache_size": settings.POSTGRES_STATEMENT_CACHE_SIZE
+        },
+    )
+
+
+ROUND_ROBIN = "round_robin"
+LEAST_CONNECTIONS = "least_connections"
+
+DB_REPLICA_HEALTHY = registry.register(
+    Gauge(
+        "db_replica_healthy",
+        "1 if the read replica passed its last health check",
+        ("replica",),
+    )
+)
+
+
+class Replica:
+    """Движок реплики и результат последней проверки здоровья"""
+
+    def __init__(self, url: str):
+        self.engine = create_engine_from_settings(url)
+        # Транзакции только на чтение: запись на реплику падает сразу, а не после отправки на сервер
+        self.read_engine = self.engine.execution_options(postgresql_readonly=True)
+        self.name = f"{self.engine.url.host}:{self.engine.url.port}"
+        self.healthy = True
+        DB_REPLICA_HEALTHY.set(1, self.name)
+
+    def mark(self, healthy: bool, reason: str | None = None):
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Read replica %s is back", self.name)
+            else:
+                logger.warning(
+                    "Read replica %s marked unhealthy: %s", self.name, reason
+                )
+        self.healthy = healthy
+        DB_REPLICA_HEALTHY.set(int(healthy), self.name)
+
+
+class ReplicaRouter:
+    """
+    Выбирает движок для чтения: здоровые реплики по кругу (round_robin) или реплику
+    с наименьшим числом занятых соединений (least_connections).
+    Без реплик или когда все они нездоровы, чтение идёт на primary
+    """
+
+    def __init__(self, primary: AsyncEngine, urls: Sequence[str], balancing: str):
+        self.primary = primary.execution_options(postgresql_readonly=True)
+        self.replicas: List[Replica] = [Replica(url) for url in urls]
+        self.balancing = balancing
+        self._next = 0
+
+    def choose(self) -> AsyncEngine:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return self.primary
+        if self.balancing == LEAST_CONNECTIONS:
+            replica = min(healthy, key=lambda replica: replica.engine.pool.checkedout())
+        else:
+            replica = healthy[self._next % len(healthy)]
+            self._next += 1
+        return replica.read_engine
+
+    def replica_for(self, read_engine: AsyncEngine) -> Replica | None:
+        for replica in self.replicas:
+            if replica.read_engine is read_engine:
+                return replica
+        return None
+
+    async def check_health(
+        self, timeout: float = settings.POSTGRES_REPLICA_HEALTH_CHECK_TIMEOUT
+    ):
+        """Проверяет все реплики одновременно запросом SELECT 1"""
+
+        async def check(replica: Replica):
+            try:
+                async with asyncio.timeout(timeout):
+                    async with replica.engine.connect() as conn:
+                        await conn.execute(text("SELECT 1"))
+            except Exception as e:
+                replica.mark(False, repr(e))
+            else:
+                replica.mark(True)
+
+        await asyncio.gather(*(check(replica) for replica in self.replicas))
+
+    async def run_health_checks(
+        self, interval: float = settings.POSTGRES_REPLICA_HEALTH_CHECK_INTERVAL
+    ):
+        """Фоновая проверка здоровья: вернувшаяся реплика снова получает запросы"""
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    def stats(self) -> List[dict]:
+        return [
+            {
+                "replica": replica.name,
+                "healthy": replica.healthy,
+                **replica.engine.pool.stats(),
+            }
+            for replica in self.replicas
+        ]
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+engine = create_engine_from_settings(settings.POSTGRES_URL)
+replica_router = ReplicaRouter(
+    engine, settings.POSTGRES_REPLICA_URLS, settings.POSTGRES_REPLICA_BALANCING
+)
 Base = declarative_base()
+# Триграммные и KNN-индексы моделей требуют расширений, ставим их до создания таблиц
+for _extension in ("pg_trgm", "cube", "earthdistance"):
+    event.listen(
+        Base.metadata,
+        "before_create",
+        DDL(f"CREATE EXTENSION IF NOT EXISTS {_extension}").execute_if(
+            dialect="postgresql"
+        ),
+    )
+# Подсчёт запросов на уровне класса Engine, чтобы учитывались все движки процесса
+event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+event.listen(Engine, "after_cursor_execute", after_cursor_execute)
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
+def pool_stats() -> dict:
+    """Текущее состояние пула соединений"""
+    stats = engine.pool.stats()
+    if replica_router.replicas:
+        stats["replicas"] = replica_router.stats()
+    return stats
+
+
 async def init_db():
     logger.info("Initializing database and creating tables if not exist")
     async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Несколько процессов не создают таблицы одновременно, блокировка снимется с транзакцией
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(:lock_id)"),
+                {"lock_id": MIGRATION_LOCK_ID},
+            )
         await conn.run_sync(Base.metadata.create_all)
     logger.info("Database initialized")
 
 
+async def warm_pool(
+    target: AsyncEngine = engine, connections: int = settings.POSTGRES_MIN_CONN_SIZE
+):
+    """Открывает соединения пула заранее, чтобы первые запросы не платили за подключение"""
+
+    async def ping():
+        async with target.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # Соединения берутся одновременно, иначе пул раз за разом отдавал бы одно и то же
+    await asyncio.gather(*(ping() for _ in range(connections)))
+    logger.info(
+        "DB pool warmed up: %s, %d connections",
+        target.url.host,
+        target.pool.checkedin(),
+    )
+
+
 async def get_session() -> AsyncSession:
     logger.debug("Opening new DB session")
     async with async_session() as session:
         yield session
     logger.debug("DB session closed")
+
+
+def _is_connection_error(e: BaseException) -> bool:
+    """Реплика не отдала соединение или оборвала его, а не ошибка самого запроса"""
+    if isinstance(e, OSError):
+        return True
+    return isinstance(e, DBAPIError) and (
+        e.connection_invalidated or isinstance(e, (OperationalError, InterfaceError))
+    )
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """
+    Сессия только для чтения на реплике. Соединение берётся при первом запросе,
+    а не при открытии сессии: ответы из кэша и 304 не трогают БД.
+    Если реплика не отдала соединение или оборвала его, она помечается нездоровой
+    до следующей удачной проверки, и следующие сессии уходят на другие реплики
+    """
+    read_engine = replica_router.choose()
+    async with async_session(bind=read_engine) as session:
+        try:
+            yield session
+        except Exception as e:
+            replica = replica_router.replica_for(read_engine)
+            if replica is not None and _is_connection_error(e):
+                replica.mark(False, repr(e))
+            raise
+
+
+T = TypeVar("T")
+
+
+async def run_in_read_session(work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """
+    Выполняет чтение work в своей сессии только для чтения и возвращает результат.
+    Если соединение не выдано или оборвалось, чтение один раз повторяется в новой сессии:
+    сбойная реплика уже помечена нездоровой, и replica_router выберет другую реплику
+    или primary. Клиенту до конца work ничего не отдаётся, поэтому повтор безопасен,
+    а ошибку не получают все запросы, которые ждут этот вызов через SingleFlight.
+    Потоковые чтения так не повторить: часть строк уже может быть отправлена
+    """
+    try:
+        async with read_session() as session:
+            return await work(session)
+    except Exception as e:
+        if not _is_connection_error(e):
+            raise
+        logger.warning("Read failed on a connection error, retrying once: %r", e)
+    async with read_session() as session:
+        return await work(session)
+
+
+async def get_read_session() -> AsyncSession:
+    logger.debug("Opening new read-only DB session")
+    async with read_session() as session:
+        yield session
+    logger.debug("Read-only DB session closed")
+
+
+# Метрики пула primary читаются только в момент запроса /metrics
+for _name, _key, _metric_class, _documentation in (
+    ("db_pool_size", "size", CallbackGauge, "Configured DB pool size"),
+    ("db_pool_checked_out", "checked_out", CallbackGauge, "DB connections in use"),
+    ("db_pool_checked_in", "checked_in", CallbackGauge, "Idle DB connections"),
+    ("db_pool_overflow", "overflow", CallbackGauge, "DB connections over pool size"),
+    (
+        "db_pool_waits_total",
+        "wait_count",
+        CallbackCounter,
+        "DB connection checkouts that waited for an exhausted pool",
+    ),
+    (
+        "db_pool_wait_seconds_total",
+        "wait_time_total",
+        CallbackCounter,
+        "Seconds spent waiting for a DB connection from an exhausted pool",
+    ),
+):
+    registry.register(
+        _metric_class(_name, _documentation, lambda key=_key: engine.pool.stats()[key])
+    )
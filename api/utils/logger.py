@@ -1,8 +1,23 @@
+import atexit
 import logging
 import os
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+
+import orjson
+
 from core.settings import get_settings
 
-LOG_LEVEL = get_settings().LOG_LEVEL.upper()
+settings = get_settings()
+
+LOG_LEVEL = settings.LOG_LEVEL.upper()
 try:
     level = getattr(logging, LOG_LEVEL)
 except Exception:
@@ -10,22 +25,134 @@ except Exception:
 
 ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
 LOG_DIR = os.path.join(ROOT_DIR, "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
 LOG_FILE = os.path.join(LOG_DIR, "app.log")
 
-formatter = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+DROP_NEW = "drop_new"
+DROP_OLDEST = "drop_oldest"
+
+# Стандартные атрибуты LogRecord, всё остальное в записи - поля из extra
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна JSON-строка, поля из extra попадают в неё как есть"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(payload, default=str).decode()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Кладёт записи в ограниченную очередь и никогда не блокирует вызывающий код.
+    При переполнении отбрасывает новую (drop_new) или самую старую (drop_oldest) запись,
+    число потерянных записей сообщается следующей успешно поставленной записью
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow_policy: str = DROP_NEW):
+        super().__init__(log_queue)
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Очередь внутри процесса: форматирование целиком остаётся потоку слушателя
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.dropped and not self.queue.full():
+            with self._dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                self._put(
+                    logging.makeLogRecord(
+                        {
+                            "name": __name__,
+                            "levelno": logging.WARNING,
+                            "levelname": "WARNING",
+                            "msg": "Log queue overflow: %d records dropped",
+                            "args": (dropped,),
+                        }
+                    )
+                )
+        self._put(record)
+
+    def _put(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.overflow_policy == DROP_OLDEST:
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+        with self._dropped_lock:
+            self.dropped += 1
+
+
+def _build_file_handler() -> logging.Handler:
+    os.makedirs(LOG_DIR, exist_ok=True)
+    # delay: файл откроется при первой записи, уже в потоке слушателя
+    if settings.LOG_ROTATION == "size":
+        return RotatingFileHandler(
+            LOG_FILE,
+            maxBytes=settings.LOG_MAX_BYTES,
+            backupCount=settings.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+            delay=True,
+        )
+    if settings.LOG_ROTATION == "time":
+        return TimedRotatingFileHandler(
+            LOG_FILE,
+            when=settings.LOG_ROTATION_WHEN,
+            backupCount=settings.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+            delay=True,
+        )
+    return logging.FileHandler(LOG_FILE, encoding="utf-8", delay=True)
+
+
+if settings.LOG_FORMAT == "json":
+    formatter = JsonFormatter()
+else:
+    formatter = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
 
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
+handlers = [console_handler]
+
+if settings.LOG_TO_FILE:
+    file_handler = _build_file_handler()
+    file_handler.setFormatter(formatter)
+    handlers.append(file_handler)
 
-file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
-file_handler.setFormatter(formatter)
+# Запись на диск и в консоль идёт в отдельном потоке, event loop только кладёт запись в очередь
+log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+queue_handler = BoundedQueueHandler(log_queue, settings.LOG_OVERFLOW_POLICY)
+listener = QueueListener(log_queue, *handlers)
 
 root_logger = logging.getLogger()
 if not root_logger.handlers:
+    # Уровень на корневом логгере: отфильтрованные записи даже не создаются
     root_logger.setLevel(level)
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
+    root_logger.addHandler(queue_handler)
+    listener.start()
+    atexit.register(listener.stop)
 
 
 def get_logger(name: str | None = None) -> logging.Logger:
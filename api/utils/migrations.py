@@ -0,0 +1,46 @@
+import asyncio
+import os
+
+from .db import engine, init_db
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+
+
+def apply_migrations():
+    """Применяет миграции Alembic до head, параллельные запуски ждут advisory-блокировку"""
+    from alembic import command
+    from alembic.config import Config
+
+    logger.info("Starting Alembic migrations...")
+    try:
+        command.upgrade(Config(ALEMBIC_INI), "head")
+        logger.info("Alembic migrations applied successfully")
+    except Exception as e:
+        logger.error(f"Failed to apply migrations: {str(e)}")
+        raise
+
+
+async def prepare_database():
+    """Создаёт недостающие таблицы и применяет миграции"""
+    logger.info("Initializing database...")
+    await init_db()
+    logger.info("Applying migrations...")
+    await asyncio.to_thread(apply_migrations)
+
+
+def prepare_database_sync():
+    """
+    Готовит схему до запуска сервера, вне жизненного цикла приложения.
+    Пул закрывается вместе с временным event loop, воркеры откроют свои соединения
+    """
+
+    async def prepare():
+        try:
+            await prepare_database()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(prepare())
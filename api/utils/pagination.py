@@ -0,0 +1,32 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Sequence
+
+from fastapi import exceptions
+
+
+def encode_cursor(*values: Any) -> str:
+    """Упаковывает значения ключа последней записи страницы в непрозрачный курсор"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """Распаковывает курсор и проверяет, что он подходит к ожидаемому ключу"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        values = None
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or not all(
+            isinstance(value, (int, float) if t is float else t)
+            and not isinstance(value, bool)
+            for value, t in zip(values, types)
+        )
+    ):
+        raise exceptions.HTTPException(status_code=400, detail="Некорректный курсор")
+    return values
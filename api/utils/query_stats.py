@@ -0,0 +1,144 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.settings import get_settings
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+SLOWEST_STATEMENT_LENGTH = 200
+
+
+class QueryStats:
+    """Число SQL-запросов, суммарное время в БД и самый медленный запрос"""
+
+    __slots__ = ("count", "total_time", "slowest_time", "slowest_statement")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: str | None = None
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed >= self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def as_dict(self) -> dict:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.total_time * 1000, 2),
+            "slowest_ms": round(self.slowest_time * 1000, 2),
+            "slowest_statement": (
+                " ".join(self.slowest_statement.split())[:SLOWEST_STATEMENT_LENGTH]
+                if self.slowest_statement
+                else None
+            ),
+        }
+
+
+# Все активные счётчики текущего контекста: вложенный подсчёт не прячет запросы от внешнего
+_active_stats: ContextVar[Tuple[QueryStats, ...]] = ContextVar(
+    "active_query_stats", default=()
+)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Считает запросы к БД, выполненные внутри блока в текущем контексте"""
+    stats = QueryStats()
+    token = _active_stats.set(_active_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Помощник для тестов: падает, если внутри блока выполнено больше max_queries запросов.
+        with assert_max_queries(4):
+            await client.get("/v1/organizations/organization")
+    """
+    with track_queries() as stats:
+        yield stats
+    assert stats.count <= max_queries, (
+        f"Expected at most {max_queries} queries, got {stats.count}; "
+        f"slowest: {stats.as_dict()['slowest_statement']}"
+    )
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_stats.get():
+        context._query_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    for stats in _active_stats.get():
+        stats.record(statement, elapsed)
+
+
+class QueryStatsMiddleware:
+    """
+    Считает SQL-запросы каждого HTTP-запроса, отдаёт их в заголовке Server-Timing
+    и пишет в лог запросы, превысившие пороги из настроек
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        settings = get_settings()
+        self.slow_request_ms = settings.SLOW_REQUEST_THRESHOLD_MS
+        self.max_queries = settings.REQUEST_QUERY_COUNT_THRESHOLD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        with track_queries() as stats:
+
+            async def send_with_timing(message: Message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        f'db;dur={stats.total_time * 1000:.2f};desc="{stats.count} queries", '
+                        f"db-slowest;dur={stats.slowest_time * 1000:.2f}, "
+                        f"app;dur={(time.perf_counter() - started) * 1000:.2f}",
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= self.slow_request_ms or stats.count > self.max_queries:
+            request_stats = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round(duration_ms, 2),
+                **stats.as_dict(),
+            }
+            logger.warning(
+                "Request over threshold: %s",
+                " ".join(f"{key}={value!r}" for key, value in request_stats.items()),
+                extra={"request_stats": request_stats},
+            )
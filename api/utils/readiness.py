@@ -0,0 +1,59 @@
+import time
+from typing import Dict, Iterable
+
+from .metrics import CallbackGauge, registry
+
+
+class Readiness:
+    """
+    Готовность процесса принимать трафик. Процесс готов, когда пройдены все
+    ожидаемые шаги прогрева, и перестаёт быть готовым с началом остановки
+    """
+
+    def __init__(self):
+        self._pending: set[str] = set()
+        self._done: Dict[str, float] = {}
+        self._started_at: float | None = None
+        self._shutting_down = False
+
+    def start(self, checks: Iterable[str]):
+        """Начинает прогрев: процесс не готов, пока не отмечены все checks"""
+        self._pending = set(checks)
+        self._done = {}
+        self._started_at = time.perf_counter()
+        self._shutting_down = False
+
+    def mark_done(self, check: str):
+        self._pending.discard(check)
+        self._done[check] = round(time.perf_counter() - self._started_at, 3)
+
+    def shutdown(self):
+        self._shutting_down = True
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self._started_at is not None
+            and not self._pending
+            and not self._shutting_down
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "shutting_down": self._shutting_down,
+            "pending": sorted(self._pending),
+            # Секунды от начала прогрева до завершения каждого шага
+            "done": self._done,
+        }
+
+
+readiness = Readiness()
+
+registry.register(
+    CallbackGauge(
+        "app_ready",
+        "1 when the process has warmed up and accepts traffic",
+        lambda: int(readiness.ready),
+    )
+)
@@ -0,0 +1,48 @@
+import signal
+import time
+from types import FrameType
+
+import uvicorn
+
+from .logger import get_logger
+from .readiness import readiness
+
+logger = get_logger(__name__)
+
+
+class PreStopServer(uvicorn.Server):
+    """
+    Сервер uvicorn с паузой перед остановкой. По первому SIGTERM процесс сразу
+    становится неготовым (/ready отвечает 503), но ещё pre_stop_delay секунд принимает
+    запросы, пока балансировщик не уберёт его из ротации. Затем uvicorn, как обычно,
+    перестаёт принимать соединения и дожидается текущих запросов.
+    Повторный SIGTERM паузу не сокращает: его шлют и супервизор воркеров, и тот, кто
+    останавливает всю группу процессов. SIGINT останавливает сервер без паузы
+    """
+
+    def __init__(self, config: uvicorn.Config, pre_stop_delay: float):
+        super().__init__(config)
+        self.pre_stop_delay = pre_stop_delay
+        self._stop_at: float | None = None
+        self._announced = False
+
+    def handle_exit(self, sig: int, frame: FrameType | None) -> None:
+        # Обработчик сигнала только меняет состояние: логирование и остальное - в on_tick
+        if sig == signal.SIGTERM and self.pre_stop_delay > 0 and not self.should_exit:
+            if self._stop_at is None:
+                readiness.shutdown()
+                self._stop_at = time.monotonic() + self.pre_stop_delay
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        if self._stop_at is not None and not self.should_exit:
+            if not self._announced:
+                self._announced = True
+                logger.info(
+                    "SIGTERM received, not ready; shutting down in %ss",
+                    self.pre_stop_delay,
+                )
+            if time.monotonic() >= self._stop_at:
+                super().handle_exit(signal.SIGTERM, None)
+        return await super().on_tick(counter)
@@ -0,0 +1,94 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, TypeVar
+
+from .logger import get_logger
+from .metrics import Counter, Gauge, registry
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+SINGLE_FLIGHT_CALLS = registry.register(
+    Counter(
+        "single_flight_calls_total",
+        "Calls by group and role: leader runs the work, follower awaits its result",
+        ("group", "role"),
+    )
+)
+SINGLE_FLIGHT_IN_FLIGHT = registry.register(
+    Gauge(
+        "single_flight_in_flight",
+        "Distinct keys being computed right now by group",
+        ("group",),
+    )
+)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Склеивает одновременные одинаковые вызовы внутри процесса: пока по ключу идёт
+    вычисление, остальные вызывающие ждут его результат вместо своего.
+
+    Вычисление идёт в отдельной задаче и не зависит от того, кто его запустил:
+    отмена одного вызывающего не отменяет результат для остальных, задача отменяется,
+    только когда её перестали ждать все. Исключение получают все ждущие.
+    Результат не сохраняется - следующий вызов после завершения считает заново
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._start(key, fn)
+            SINGLE_FLIGHT_CALLS.inc(self.name, "leader")
+        else:
+            SINGLE_FLIGHT_CALLS.inc(self.name, "follower")
+        flight.waiters += 1
+        try:
+            # shield: отмена вызывающего не доходит до общей задачи
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # Ждать больше некому. Ключ освобождается сразу,
+                # чтобы новый вызов не присоединился к отменяемой задаче
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _start(self, key: str, fn: Callable[[], Awaitable[T]]) -> _Flight:
+        flight = _Flight(asyncio.get_running_loop().create_task(fn()))
+        self._flights[key] = flight
+        SINGLE_FLIGHT_IN_FLIGHT.inc(self.name)
+        flight.task.add_done_callback(lambda task: self._finish(key, flight, task))
+        return flight
+
+    def _finish(self, key: str, flight: _Flight, task: asyncio.Task):
+        self._forget(key, flight)
+        if not task.cancelled() and task.exception() is not None and not flight.waiters:
+            # Все ждущие успели уйти, иначе ошибку получили бы они
+            logger.warning(
+                "Single-flight %s call failed with no waiters: %r",
+                self.name,
+                task.exception(),
+            )
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+            SINGLE_FLIGHT_IN_FLIGHT.dec(self.name)
+
+    def in_flight(self) -> int:
+        return len(self._flights)
@@ -0,0 +1,22 @@
+import zlib
+from typing import AsyncIterable, AsyncIterator, Iterable
+
+import orjson
+
+
+async def ndjson_stream(batches: AsyncIterable[Iterable[dict]]) -> AsyncIterator[bytes]:
+    """Кодирует пачки объектов в NDJSON, по одному куску на пачку"""
+    async for batch in batches:
+        chunk = b"".join(orjson.dumps(item) + b"\n" for item in batch)
+        if chunk:
+            yield chunk
+
+
+async def gzip_stream(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Сжимает поток кусков в gzip на лету, не накапливая его целиком"""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
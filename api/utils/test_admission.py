@@ -0,0 +1,148 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from utils.admission import (
+    QUEUE_FULL,
+    QUEUE_TIMEOUT,
+    AdmissionControlMiddleware,
+    AdmissionController,
+    AdmissionLimiter,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+def make_limiter(limit=1, queue_size=1, queue_timeout=1.0) -> AdmissionLimiter:
+    return AdmissionLimiter("test", limit, queue_size, queue_timeout)
+
+
+async def wait_for_queue(limiter: AdmissionLimiter, depth: int):
+    while limiter.queue_depth != depth:
+        await asyncio.sleep(0)
+
+
+async def test_admits_up_to_limit_without_queueing():
+    limiter = make_limiter(limit=2)
+    assert await limiter.acquire() is None
+    assert await limiter.acquire() is None
+    assert limiter.in_flight == 2
+    assert limiter.queue_depth == 0
+
+
+async def test_rejects_when_queue_is_full():
+    limiter = make_limiter(limit=1, queue_size=1)
+    await limiter.acquire()
+    waiting = asyncio.create_task(limiter.acquire())
+    await wait_for_queue(limiter, 1)
+
+    assert await limiter.acquire() == QUEUE_FULL
+    assert limiter.rejected[QUEUE_FULL] == 1
+
+    limiter.release()
+    assert await waiting is None
+
+
+async def test_rejects_after_queue_timeout():
+    limiter = make_limiter(limit=1, queue_timeout=0.01)
+    await limiter.acquire()
+
+    assert await limiter.acquire() == QUEUE_TIMEOUT
+    assert limiter.rejected[QUEUE_TIMEOUT] == 1
+    assert limiter.queue_depth == 0
+    assert limiter.in_flight == 1
+
+
+async def test_release_hands_slot_to_waiters_in_order():
+    limiter = make_limiter(limit=1, queue_size=2)
+    await limiter.acquire()
+    admitted = []
+
+    async def wait(name):
+        assert await limiter.acquire() is None
+        admitted.append(name)
+
+    first = asyncio.create_task(wait("first"))
+    await wait_for_queue(limiter, 1)
+    second = asyncio.create_task(wait("second"))
+    await wait_for_queue(limiter, 2)
+
+    limiter.release()
+    await first
+    # Слот передан, а не освобождён: in_flight не меняется
+    assert limiter.in_flight == 1
+    assert admitted == ["first"]
+
+    limiter.release()
+    await second
+    assert admitted == ["first", "second"]
+
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+async def test_cancelled_waiter_leaves_queue():
+    limiter = make_limiter(limit=1, queue_size=1)
+    await limiter.acquire()
+    waiting = asyncio.create_task(limiter.acquire())
+    await wait_for_queue(limiter, 1)
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert limiter.queue_depth == 0
+
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+async def test_slot_handed_to_cancelled_waiter_goes_to_next():
+    limiter = make_limiter(limit=1, queue_size=2)
+    await limiter.acquire()
+    cancelled = asyncio.create_task(limiter.acquire())
+    await wait_for_queue(limiter, 1)
+    next_waiter = asyncio.create_task(limiter.acquire())
+    await wait_for_queue(limiter, 2)
+
+    # Слот передан, но ждущий отменён раньше, чем успел его занять
+    limiter.release()
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    assert await next_waiter is None
+    assert limiter.in_flight == 1
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+async def test_middleware_rejects_over_limit_with_retry_after():
+    app = FastAPI()
+    started, finish = asyncio.Event(), asyncio.Event()
+
+    @app.get("/v1/slow")
+    async def slow():
+        started.set()
+        await finish.wait()
+        return {"ok": True}
+
+    controller = AdmissionController(
+        limit=1, queue_size=0, queue_timeout=1.0, route_limits={}
+    )
+    app.add_middleware(AdmissionControlMiddleware, controller=controller, retry_after=3)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        admitted = asyncio.create_task(client.get("/v1/slow"))
+        await started.wait()
+
+        rejected = await client.get("/v1/slow")
+        assert rejected.status_code == 503
+        assert rejected.headers["Retry-After"] == "3"
+
+        finish.set()
+        assert (await admitted).status_code == 200
+    assert controller.default.in_flight == 0
+    assert controller.default.rejected[QUEUE_FULL] == 1
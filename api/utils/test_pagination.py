@@ -0,0 +1,62 @@
+import base64
+
+import pytest
+from fastapi import exceptions
+
+from utils.pagination import decode_cursor, encode_cursor
+
+
+def raw_cursor(payload: bytes) -> str:
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "values, types",
+    [
+        ((42,), (int,)),
+        ((0.8125, 7), (float, int)),
+        # Целый ранг после JSON остаётся int, но подходит к ключу с float
+        ((1, 7), (float, int)),
+        ((1234.56789, 2**40), (float, int)),
+    ],
+)
+def test_round_trip(values, types):
+    cursor = encode_cursor(*values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, types) == list(values)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "не base64",
+        "%%%",
+        raw_cursor(b"not json"),
+        raw_cursor(b'{"id": 1}'),
+        raw_cursor(b'["1"]'),
+        raw_cursor(b"[true]"),
+        raw_cursor(b"[1.5]"),
+        raw_cursor(b"[1, 2]"),
+        encode_cursor(1)[:-1] + "!",
+    ],
+)
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(exceptions.HTTPException) as error:
+        decode_cursor(cursor, (int,))
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "cursor, types",
+    [
+        # Курсор сортировки по id не подходит к сортировке по релевантности и наоборот
+        (encode_cursor(7), (float, int)),
+        (encode_cursor(0.5, 7), (int,)),
+        (encode_cursor(0.5, 7.5), (float, int)),
+    ],
+)
+def test_cursor_for_other_key_is_rejected(cursor, types):
+    with pytest.raises(exceptions.HTTPException) as error:
+        decode_cursor(cursor, types)
+    assert error.value.status_code == 400
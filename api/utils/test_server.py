@@ -0,0 +1,63 @@
+import asyncio
+import signal
+
+import pytest
+import uvicorn
+
+from utils.readiness import readiness
+from utils.server import PreStopServer
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def ready(monkeypatch):
+    """Готовый процесс; состояние общей readiness восстанавливается после теста"""
+    monkeypatch.setattr(readiness, "_pending", set())
+    monkeypatch.setattr(readiness, "_started_at", 0.0)
+    monkeypatch.setattr(readiness, "_shutting_down", False)
+    assert readiness.ready
+
+
+def make_server(pre_stop_delay: float) -> PreStopServer:
+    return PreStopServer(uvicorn.Config(app=None), pre_stop_delay)
+
+
+async def test_sigterm_flips_readiness_before_stopping(ready):
+    server = make_server(0.05)
+    server.handle_exit(signal.SIGTERM, None)
+    assert not readiness.ready
+    # Во время паузы сервер ещё принимает запросы
+    assert not await server.on_tick(1)
+    assert not server.should_exit
+
+    await asyncio.sleep(0.06)
+    assert await server.on_tick(2)
+    assert server.should_exit
+
+
+async def test_repeated_sigterm_keeps_delay(ready):
+    server = make_server(60)
+    server.handle_exit(signal.SIGTERM, None)
+    server.handle_exit(signal.SIGTERM, None)
+    assert not await server.on_tick(1)
+
+
+async def test_sigint_during_delay_stops_at_once(ready):
+    server = make_server(60)
+    server.handle_exit(signal.SIGTERM, None)
+    server.handle_exit(signal.SIGINT, None)
+    assert await server.on_tick(1)
+
+
+async def test_sigint_stops_without_delay(ready):
+    server = make_server(60)
+    server.handle_exit(signal.SIGINT, None)
+    assert await server.on_tick(1)
+    assert readiness.ready
+
+
+async def test_zero_delay_stops_at_once(ready):
+    server = make_server(0)
+    server.handle_exit(signal.SIGTERM, None)
+    assert await server.on_tick(1)
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from utils.singleflight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+class Work:
+    """Вычисление, которое ждёт разрешения завершиться и считает запуски"""
+
+    def __init__(self, result="result"):
+        self.result = result
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.finish = asyncio.Event()
+        self.cancelled = False
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        try:
+            await self.finish.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight("test")
+    work = Work()
+    calls = [asyncio.create_task(flights.do("key", work)) for _ in range(3)]
+    await work.started.wait()
+    assert flights.in_flight() == 1
+
+    work.finish.set()
+    assert await asyncio.gather(*calls) == ["result"] * 3
+    assert work.calls == 1
+    assert flights.in_flight() == 0
+
+
+async def test_different_keys_do_not_share():
+    flights = SingleFlight("test")
+    first, second = Work("first"), Work("second")
+    first.finish.set()
+    second.finish.set()
+    assert await flights.do("first", first) == "first"
+    assert await flights.do("second", second) == "second"
+
+
+async def test_result_is_not_kept_after_completion():
+    flights = SingleFlight("test")
+    work = Work()
+    work.finish.set()
+    await flights.do("key", work)
+    await flights.do("key", work)
+    assert work.calls == 2
+
+
+async def test_error_reaches_leader_and_followers():
+    flights = SingleFlight("test")
+    work = Work(ValueError("boom"))
+    leader = asyncio.create_task(flights.do("key", work))
+    await work.started.wait()
+    follower = asyncio.create_task(flights.do("key", work))
+    await asyncio.sleep(0)
+
+    work.finish.set()
+    for call in (leader, follower):
+        with pytest.raises(ValueError, match="boom"):
+            await call
+    assert work.calls == 1
+    assert flights.in_flight() == 0
+
+
+async def test_leader_cancellation_does_not_cancel_followers():
+    flights = SingleFlight("test")
+    work = Work()
+    leader = asyncio.create_task(flights.do("key", work))
+    await work.started.wait()
+    follower = asyncio.create_task(flights.do("key", work))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert not work.cancelled
+
+    work.finish.set()
+    assert await follower == "result"
+    assert work.calls == 1
+
+
+async def test_follower_cancellation_does_not_cancel_leader():
+    flights = SingleFlight("test")
+    work = Work()
+    leader = asyncio.create_task(flights.do("key", work))
+    await work.started.wait()
+    follower = asyncio.create_task(flights.do("key", work))
+    await asyncio.sleep(0)
+
+    follower.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await follower
+
+    work.finish.set()
+    assert await leader == "result"
+    assert not work.cancelled
+
+
+async def test_last_waiter_cancellation_cancels_computation():
+    flights = SingleFlight("test")
+    work = Work()
+    leader = asyncio.create_task(flights.do("key", work))
+    await work.started.wait()
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    # Ключ освобождён сразу: новый вызов не присоединяется к отменяемой задаче
+    assert flights.in_flight() == 0
+    await asyncio.sleep(0)
+    assert work.cancelled
+
+    fresh = Work("fresh")
+    fresh.finish.set()
+    assert await flights.do("key", fresh) == "fresh"